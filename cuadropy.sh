@@ -1,10 +1,23 @@
-
 #!/usr/bin/env bash
 
 if [[ ! $1 ]]; then
   echo "Missing required argument: PROGRAM"
-  echo "Usage: sh cuadropy.sh path/to/program.cupy"
+  echo "Usage: sh cuadropy.sh path/to/program.cupy [-f pdf|markdown|html|json]"
+  echo "       sh cuadropy.sh batch path/to/recipes/ [-o out_dir] [-j jobs]"
+  echo "       sh cuadropy.sh cookbook path/to/recipes/ [-o cookbook.pdf] [--title title]"
+  echo "       sh cuadropy.sh watch path/to/recipes/ [-o out_dir]"
+  echo "       sh cuadropy.sh serve [--port 8765 | --socket path]"
+  echo "       sh cuadropy.sh client path/to/program.cupy [-o out.pdf]"
+  echo "       sh cuadropy.sh index build path/to/recipes/ [-i recipes.idx]"
+  echo "       sh cuadropy.sh index query [--ingredient name] [--step name] [--title text]"
   exit
 fi
 
-python3 -m src.main $1
+case $1 in
+  compile|batch|cookbook|watch|serve|client|index)
+    python3 -m src.main "$@"
+    ;;
+  *)
+    python3 -m src.main compile "$@"
+    ;;
+esac
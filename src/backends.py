@@ -0,0 +1,311 @@
+"""
+    Output backends of the OutputGenerator.
+
+    The OutputGenerator walks the program and tells its backend what to
+    output, already formatted as the recipe shows it: titles, ingredients,
+    and the numbered cooking steps with their ingredients. Backends only
+    decide how each of those looks. Only the PDF backend imports fpdf.
+"""
+import abc
+import html
+import json
+import os
+from typing import List, Optional
+
+
+class OutputBackend(abc.ABC):
+    """The interface every output format implements.
+
+    `depth` is the indentation of a line: 0 for the cooking steps of the
+    recipe, and one more for each level of nesting below them. When
+    `filename` is given and `stream` is set, the backend writes to the
+    file as it goes instead of keeping the whole document in memory.
+    """
+
+    extension = ""
+
+    def __init__(self, filename: Optional[str] = None, stream: bool = False):
+        self.filename = filename
+
+    @abc.abstractmethod
+    def title(self, text: str):
+        pass
+
+    @abc.abstractmethod
+    def subtitle(self, text: str):
+        pass
+
+    @abc.abstractmethod
+    def ingredient(self, name: str, quantity: str):
+        pass
+
+    @abc.abstractmethod
+    def step(self, number: str, name: str, depth: int):
+        pass
+
+    @abc.abstractmethod
+    def step_ingredient(self, name: str, depth: int):
+        pass
+
+    @abc.abstractmethod
+    def to_bytes(self) -> bytes:
+        pass
+
+    def save(self):
+        with open(self.filename, "wb") as f:
+            f.write(self.to_bytes())
+
+    def discard(self):
+        """Drops an unfinished document, removing what was already streamed."""
+
+
+class PdfBackend(OutputBackend):
+    extension = ".pdf"
+
+    def __init__(self, filename=None, stream=False):
+        super().__init__(filename, stream)
+        self.pdf = self._create_pdf(filename, stream)
+        self.pdf.set_font("Arial", size=12)
+        self._font = (12, "")
+
+    def _create_pdf(self, filename, stream):
+        # fpdf is slow to import, so it's only loaded once output is generated
+        if stream:
+            from src.pdf_writer import StreamingFPDF
+
+            return StreamingFPDF(filename)
+
+        from fpdf import FPDF
+
+        return FPDF()
+
+    def _set_font(self, size, style=""):
+        # FPDF keeps the font across pages, so it only changes when asked to
+        if self._font != (size, style):
+            self.pdf.set_font("Arial", size=size, style=style)
+            self._font = (size, style)
+
+    def _line(self, depth, text):
+        """Writes a whole line, indentation included, with a single draw call."""
+        self.pdf.write(10, "\t" * (depth * 8) + text)
+        self.pdf.ln()
+
+    def title(self, text):
+        self.pdf.add_page()
+        self._set_font(16, "B")
+        self.pdf.cell(0, 10, text, ln=1, align="C")
+
+    def subtitle(self, text):
+        self._set_font(14, "B")
+        self.pdf.cell(0, 10, text, ln=1, align="C")
+
+    def ingredient(self, name, quantity):
+        self._line(0, f"{name}, {quantity}")
+
+    def step(self, number, name, depth):
+        self._line(depth, f"Paso {number}. {name}")
+
+    def step_ingredient(self, name, depth):
+        self._line(depth, name)
+
+    def to_bytes(self):
+        # FPDF keeps the document as a latin-1 string
+        return self.pdf.output(dest="S").encode("latin1")
+
+    def save(self):
+        self.pdf.output(self.filename)
+
+    def discard(self):
+        if hasattr(self.pdf, "discard"):
+            self.pdf.discard()
+
+
+class TextBackend(OutputBackend):
+    """Base of the text formats: the document is a sequence of strings."""
+
+    def __init__(self, filename=None, stream=False):
+        super().__init__(filename, stream)
+        self._parts: List[str] = []
+        self._file = open(filename, "w", encoding="utf-8") if stream else None
+
+    def _write(self, text: str):
+        if self._file is not None:
+            self._file.write(text)
+        else:
+            self._parts.append(text)
+
+    def _end(self):
+        """Writes whatever the format needs to close the document."""
+
+    def to_bytes(self):
+        self._end()
+        return "".join(self._parts).encode("utf-8")
+
+    def save(self):
+        if self._file is None:
+            super().save()
+            return
+        self._end()
+        self._file.close()
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            os.remove(self.filename)
+
+
+class MarkdownBackend(TextBackend):
+    extension = ".md"
+
+    def title(self, text):
+        self._write(f"# {text.strip()}\n")
+
+    def subtitle(self, text):
+        self._write(f"\n## {text.strip()}\n\n")
+
+    def ingredient(self, name, quantity):
+        self._write(f"- {name}, {quantity}\n")
+
+    def step(self, number, name, depth):
+        self._write(f"{'  ' * depth}- Paso {number}. {name}\n")
+
+    def step_ingredient(self, name, depth):
+        self._write(f"{'  ' * depth}- {name}\n")
+
+
+class HtmlBackend(TextBackend):
+    extension = ".html"
+
+    def __init__(self, filename=None, stream=False):
+        super().__init__(filename, stream)
+        self._level = 0  # Number of open <ul> elements
+        self._write('<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"></head>\n<body>\n')
+
+    def _close_lists(self):
+        while self._level > 0:
+            self._write("</li></ul>\n")
+            self._level -= 1
+
+    def _item(self, level, text):
+        """An <li> at `level` nested lists, kept open so deeper lists go inside it."""
+        while self._level > level:
+            self._write("</li></ul>\n")
+            self._level -= 1
+        if self._level == level:
+            self._write("</li>\n")
+        while self._level < level:
+            self._write("<ul>\n")
+            self._level += 1
+        self._write(f"<li>{html.escape(text)}")
+
+    def title(self, text):
+        self._close_lists()
+        self._write(f"<h1>{html.escape(text.strip())}</h1>\n")
+
+    def subtitle(self, text):
+        self._close_lists()
+        self._write(f"<h2>{html.escape(text.strip())}</h2>\n")
+
+    def ingredient(self, name, quantity):
+        self._item(1, f"{name}, {quantity}")
+
+    def step(self, number, name, depth):
+        self._item(depth + 1, f"Paso {number}. {name}")
+
+    def step_ingredient(self, name, depth):
+        self._item(depth + 1, name)
+
+    def _end(self):
+        self._close_lists()
+        self._write("</body>\n</html>\n")
+
+
+class JsonBackend(TextBackend):
+    """The recipe as a JSON document.
+
+    The document has a `title` and a list of `sections`, each with its
+    `title` and `items`. Ingredients are objects with a `name` and a
+    `quantity`, and cooking steps objects with their `number`, `name`
+    and `ingredients`, which holds names and the nested steps. The tree
+    is only written once complete, even when streaming.
+    """
+
+    extension = ".json"
+
+    def __init__(self, filename=None, stream=False):
+        super().__init__(filename, stream)
+        self._document = {"title": None, "sections": []}
+        self._steps = []  # The step open at each depth
+
+    def _items(self) -> List:
+        if not self._document["sections"]:
+            self._document["sections"].append({"title": None, "items": []})
+        return self._document["sections"][-1]["items"]
+
+    def title(self, text):
+        self._document["title"] = text.strip()
+
+    def subtitle(self, text):
+        self._document["sections"].append({"title": text.strip(), "items": []})
+
+    def ingredient(self, name, quantity):
+        self._items().append({"name": name, "quantity": quantity})
+
+    def step(self, number, name, depth):
+        step = {"number": number, "name": name, "ingredients": []}
+        del self._steps[depth:]
+        if depth == 0:
+            self._items().append(step)
+        else:
+            self._steps[-1]["ingredients"].append(step)
+        self._steps.append(step)
+
+    def step_ingredient(self, name, depth):
+        self._steps[depth - 1]["ingredients"].append(name)
+
+    def _end(self):
+        self._write(json.dumps(self._document, ensure_ascii=False, indent=2))
+        self._write("\n")
+
+
+class RecordingBackend(OutputBackend):
+    """Records what is output instead of writing it anywhere.
+
+    The recorded `events` are plain tuples, so a document can be laid out
+    in a process and drawn on the backend of another one with `replay`.
+    """
+
+    def __init__(self, filename=None, stream=False):
+        super().__init__(filename, stream)
+        self.events: List[tuple] = []
+
+    def title(self, text):
+        self.events.append(("title", text))
+
+    def subtitle(self, text):
+        self.events.append(("subtitle", text))
+
+    def ingredient(self, name, quantity):
+        self.events.append(("ingredient", name, quantity))
+
+    def step(self, number, name, depth):
+        self.events.append(("step", number, name, depth))
+
+    def step_ingredient(self, name, depth):
+        self.events.append(("step_ingredient", name, depth))
+
+    def to_bytes(self):
+        return json.dumps(self.events, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def replay(events: List[tuple], backend: OutputBackend):
+        for method, *args in events:
+            getattr(backend, method)(*args)
+
+
+BACKENDS = {
+    "pdf": PdfBackend,
+    "markdown": MarkdownBackend,
+    "html": HtmlBackend,
+    "json": JsonBackend,
+}
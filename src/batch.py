@@ -0,0 +1,114 @@
+"""
+    Batch compilation of many CUADRO programs on a pool
+    of worker processes.
+"""
+import glob
+import os
+from collections import Counter
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from src.backends import BACKENDS
+from src.compiler import warm_pool, worker_compiler
+
+CUADRO_EXTENSION = ".cupy"
+
+
+class BatchResult(NamedTuple):
+    source: str
+    output: str
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _compile_job(job: Tuple[str, str]) -> BatchResult:
+    source, output = job
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    try:
+        worker_compiler().compile(source, output)
+    except Exception as e:
+        return BatchResult(source, output, f"{type(e).__name__}: {e}")
+    return BatchResult(source, output)
+
+
+def collect_sources(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """Expands files, directories and glob patterns into a list of
+    (source, name) pairs.
+
+    Directories are walked recursively looking for `.cupy` programs,
+    and `name` keeps the path relative to the given directory. Files and
+    glob matches are named by their filename. Programs that would get the
+    same name, like `x.cupy` of two directories, are named by their path
+    relative to the folder holding every program instead.
+    """
+    sources = []
+    seen = set()
+
+    def add(source, name):
+        key = os.path.realpath(source)
+        if key not in seen:
+            seen.add(key)
+            sources.append((source, name))
+
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, "**", f"*{CUADRO_EXTENSION}")
+            for source in sorted(glob.glob(pattern, recursive=True)):
+                add(source, os.path.relpath(source, path))
+        elif os.path.isfile(path):
+            add(path, os.path.basename(path))
+        else:
+            for source in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(source):
+                    add(source, os.path.basename(source))
+
+    names = Counter(os.path.normcase(name) for _, name in sources)
+    if len(names) < len(sources):
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(source)) for source, _ in sources])
+        sources = [
+            (source, os.path.relpath(os.path.abspath(source), root) if names[os.path.normcase(name)] > 1 else name)
+            for source, name in sources
+        ]
+    return sources
+
+
+def compile_batch(
+    paths: Iterable[str],
+    output_dir: str,
+    jobs: int = None,
+    cache_dir: str = None,
+    fast_lexer: bool = False,
+    output_format: str = "pdf",
+) -> List[BatchResult]:
+    """Compiles every program found in `paths` into a document inside `output_dir`,
+    in `output_format` (PDF unless told otherwise).
+
+    The results are returned in the same order the programs were found.
+    With a `cache_dir`, unchanged programs are served from the compile cache.
+    """
+    sources = collect_sources(paths)
+    work = []
+    # The program writing each output, a later program with the same
+    # output fails instead of overwriting it
+    writers = {}
+    clashes = {}
+    for i, (source, name) in enumerate(sources):
+        output = os.path.join(output_dir, os.path.splitext(name)[0] + BACKENDS[output_format].extension)
+        writer = writers.setdefault(os.path.normcase(output), source)
+        if writer == source:
+            work.append((source, output))
+        else:
+            clashes[i] = BatchResult(source, output, f"Output {output} would overwrite the one of {writer}")
+    if not sources:
+        return []
+
+    results = []
+    if work:
+        jobs = min(jobs or os.cpu_count() or 1, len(work))
+        chunksize = max(1, len(work) // (jobs * 4))
+        with warm_pool(jobs, cache_dir, fast_lexer=fast_lexer, output_format=output_format) as executor:
+            results = list(executor.map(_compile_job, work, chunksize=chunksize))
+    compiled = iter(results)
+    return [clashes[i] if i in clashes else next(compiled) for i in range(len(sources))]
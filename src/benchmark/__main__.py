@@ -0,0 +1,129 @@
+"""
+Benchmarks every phase of the CUADRO pipeline on generated recipes.
+
+Try it with `python -m src.benchmark --output results.json`
+and compare two runs with `--compare previous.json`
+"""
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import click
+
+from src.compiler import CuadroCompiler
+from .generator import RecipeGenerator
+
+PHASES = ["lex", "parse", "semantic", "output"]
+
+SCENARIOS = [
+    {"name": "small", "ingredients": 10, "steps": 5, "fanout": 3, "depth": 1},
+    {"name": "many-ingredients", "ingredients": 2000, "steps": 200, "fanout": 3, "depth": 1},
+    {"name": "many-steps", "ingredients": 200, "steps": 2000, "fanout": 2, "depth": 1},
+    {"name": "wide-fanout", "ingredients": 2000, "steps": 100, "fanout": 20, "depth": 1},
+    {"name": "deep-nesting", "ingredients": 1000, "steps": 200, "fanout": 5, "depth": 8},
+]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(compiler: CuadroCompiler, scenario, seed, scale, repeat):
+    params = {k: v for k, v in scenario.items() if k != "name"}
+    params["ingredients"] *= scale
+    params["steps"] *= scale
+    program = RecipeGenerator(seed=seed, **params).generate()
+    lines = program.count("\n")
+
+    best = {phase: float("inf") for phase in PHASES}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "out.pdf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tokens = list(compiler.lxr.tokenize(program))
+            lexed = time.perf_counter()
+            asts = compiler.parser.parse(iter(tokens))
+            parsed = time.perf_counter()
+            sem_analyzer, cooking_steps = compiler.analyze(asts)
+            analyzed = time.perf_counter()
+            compiler.generate(output, sem_analyzer, asts, cooking_steps)
+            generated = time.perf_counter()
+
+            for phase, elapsed in zip(
+                PHASES,
+                [lexed - start, parsed - lexed, analyzed - parsed, generated - analyzed],
+            ):
+                best[phase] = min(best[phase], elapsed)
+
+    return {
+        "name": scenario["name"],
+        "params": params,
+        "lines": lines,
+        "tokens": len(tokens),
+        "phases": {
+            phase: {"seconds": best[phase], "lines_per_s": lines / best[phase]}
+            for phase in PHASES
+        },
+    }
+
+
+def print_result(result, previous=None):
+    print(f"### {result['name']} ({result['lines']} lines, {result['tokens']} tokens)")
+    for phase in PHASES:
+        stats = result["phases"][phase]
+        line = f"  {phase:<9} {stats['seconds'] * 1000:10.2f} ms {stats['lines_per_s']:14,.0f} lines/s"
+        if previous and phase in previous["phases"]:
+            before = previous["phases"][phase]["seconds"]
+            line += f"  ({(stats['seconds'] - before) / before * 100:+.1f}% vs baseline)"
+        print(line)
+
+
+@click.command()
+@click.option("--seed", default=0, show_default=True)
+@click.option("--scale", default=1, show_default=True, help="Multiplies ingredient and step counts.")
+@click.option("--repeat", default=3, show_default=True, help="Runs per scenario, the best one is kept.")
+@click.option("--scenario", "only", multiple=True, help="Only run the given scenarios.")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Save the results as JSON.")
+@click.option("--compare", type=click.Path(exists=True, dir_okay=False), help="JSON results to compare against.")
+def main(seed, scale, repeat, only, output, compare):
+    previous = {}
+    if compare:
+        with open(compare) as f:
+            previous = {r["name"]: r for r in json.load(f)["results"]}
+
+    compiler = CuadroCompiler()
+    results = []
+    for scenario in SCENARIOS:
+        if only and scenario["name"] not in only:
+            continue
+        result = run_scenario(compiler, scenario, seed, scale, repeat)
+        print_result(result, previous.get(result["name"]))
+        results.append(result)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "revision": git_revision(),
+                    "python": platform.python_version(),
+                    "timestamp": time.time(),
+                    "seed": seed,
+                    "scale": scale,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
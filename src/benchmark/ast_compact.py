@@ -0,0 +1,93 @@
+"""
+Compares the compact AST nodes against the historical tuple form of the
+AST: memory kept per program and the cost of a full traversal.
+
+Try it with `python -m src.benchmark.ast_compact`
+"""
+import time
+import tracemalloc
+
+from src.lexer import CuadroLex
+from src.parser import CuadroParser, NodeKind
+from src.parser.nodes import iter_nodes
+from src.benchmark.generator import RecipeGenerator
+
+LINES = 100_000
+REPEAT = 5
+
+
+def retained(build):
+    """Runs `build` and returns its result with the bytes it kept allocated."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def walk_nodes(asts):
+    counts = [0] * len(NodeKind)
+    for node in iter_nodes(asts):
+        counts[node.kind] += 1
+    return counts
+
+
+def walk_tuples(asts):
+    counts = {}
+    stack = list(asts)
+    while stack:
+        node = stack.pop()
+        kind = node[0]
+        if kind == CuadroParser.AST_NODE_TITLE_HEADER:
+            pass
+        elif kind == CuadroParser.AST_NODE_INGREDIENTS_HEADER:
+            pass
+        elif kind == CuadroParser.AST_NODE_RECIPE_HEADER:
+            pass
+        elif kind == CuadroParser.AST_NODE_INGREDIENT_DECLARATION:
+            stack.append(node[2])
+        elif kind == CuadroParser.AST_NODE_FUNCTION_BASED_DECLARATION:
+            stack.append(node[2])
+        elif kind == CuadroParser.AST_FUNCTION_CALL:
+            stack.extend(node[2])
+        elif kind == CuadroParser.AST_IDENTIFIER:
+            pass
+        elif kind == CuadroParser.AST_STRING:
+            pass
+        elif kind == CuadroParser.AST_QUANTITY:
+            pass
+        counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+def best_of(fn, asts):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(asts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    text = RecipeGenerator(
+        seed=0, ingredients=LINES // 2, steps=LINES // 2, fanout=3, depth=2
+    ).generate()
+    tokens = list(CuadroLex().tokenize(text))
+    psr = CuadroParser()
+
+    asts, nodes_bytes = retained(lambda: psr.parse(iter(tokens)))
+    tuples, tuples_bytes = retained(lambda: [ast.to_tuple() for ast in asts])
+    total = sum(1 for _ in iter_nodes(asts))
+
+    print(f"### {len(asts)} lines, {total} nodes")
+    print("memory (names are shared by both forms)")
+    print(f"  nodes   {nodes_bytes / 2**20:8.1f} MiB  {nodes_bytes / total:6.1f} bytes per node")
+    print(f"  tuples  {tuples_bytes / 2**20:8.1f} MiB  {tuples_bytes / total:6.1f} bytes per node")
+
+    print("full traversal")
+    nodes_time = best_of(walk_nodes, asts)
+    tuples_time = best_of(walk_tuples, tuples)
+    print(f"  nodes, kind table     {nodes_time * 1000:8.1f} ms")
+    print(f"  tuples, string chain  {tuples_time * 1000:8.1f} ms")
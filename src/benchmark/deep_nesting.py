@@ -0,0 +1,96 @@
+"""
+Stress test of deeply nested cooking steps, like
+`plato = sazonar(a0, sazonar(a1, sazonar(a2, ...)));`, compiled up to the
+output with nesting depths far beyond the recursion limit of Python.
+
+Every phase handles a nesting level with an explicit stack, so the time
+per level should stay flat as the depth grows. The recursive traversals
+the analyzer and the output generator used before are run too, to show
+where they gave up.
+
+Output goes to a RecordingBackend: the indented formats write a line per
+level indented by its depth, which is quadratic in the depth.
+
+Try it with `python -m src.benchmark.deep_nesting [depth...]`
+"""
+import sys
+import time
+
+from src.backends import RecordingBackend
+from src.lexer import FastCuadroLex
+from src.output_generator import OutputGenerator, friendly_name
+from src.parser import CuadroParser, NodeKind
+from src.semantic_analyzer import CookingStep, Ingredient, SemanticAnalyzer
+
+DEPTHS = [1_000, 10_000, 100_000]
+
+
+def nested_recipe(depth: int) -> str:
+    """A recipe whose only cooking step nests `depth` calls, each using an ingredient."""
+    lines = ["# Receta Profunda #", "## Ingredientes ##"]
+    lines += [f"a{i} = 1cu;" for i in range(depth)]
+    lines += ["### Pasos a seguir ###"]
+    lines.append("plato = " + "".join(f"sazonar(a{i}, " for i in range(depth - 1)) + f"sazonar(a{depth - 1}" + ")" * depth + ";")
+    return "\n".join(lines) + "\n"
+
+
+def recursive_step(sem_analyzer: SemanticAnalyzer, call) -> CookingStep:
+    """How `SemanticAnalyzer._process_nested_cooking_step` used to build a step."""
+    ingredients = []
+    for arg in call.args:
+        if arg.kind == NodeKind.IDENTIFIER:
+            ingredients.append(sem_analyzer._INGREDIENTS[arg.name])
+        else:
+            ingredients.append(recursive_step(sem_analyzer, arg))
+    return sem_analyzer._COOKING_STEPS[call.name](sem_analyzer._INGREDIENTS, ingredients)
+
+
+def recursive_output(backend, step: CookingStep, depth=0):
+    """How `OutputGenerator._out_cooking_step` used to write a step."""
+    backend.step("1" if depth == 0 else f"1.{depth}", friendly_name(step.lexical_name()), depth)
+    for ing in step.ingredients:
+        if isinstance(ing, Ingredient):
+            backend.step_ingredient(friendly_name(ing.name), depth + 1)
+        else:
+            recursive_output(backend, ing, depth + 1)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    except RecursionError:
+        return None, "RecursionError"
+    return result, f"{time.perf_counter() - start:.3f}s"
+
+
+def compile_nested(depth: int):
+    program = nested_recipe(depth)
+    asts, parse_time = timed(lambda: CuadroParser().parse(FastCuadroLex().tokenize(program)))
+    sem_analyzer = SemanticAnalyzer(asts, build_table=False)
+    cooking_steps, analyze_time = timed(sem_analyzer.analyze)
+
+    og = OutputGenerator(None, sem_analyzer, backend=RecordingBackend())
+    _, output_time = timed(lambda: [og.generate(code) for code in asts + cooking_steps])
+    events = og.backend.events
+    _, repr_time = timed(repr, asts[-1])
+
+    # The recursive versions, on a fresh table as the program was already analyzed
+    baseline = SemanticAnalyzer(asts)
+    _, recursive_analyze_time = timed(recursive_step, baseline, asts[-1].call)
+    recorded = RecordingBackend()
+    _, recursive_output_time = timed(recursive_output, recorded, cooking_steps[0])
+    if recursive_output_time != "RecursionError":
+        assert recorded.events == [event for event in events if event[0].startswith("step")]
+
+    levels = sum(1 for event in events if event[0] == "step")
+    assert levels == depth and events[-1] == ("step_ingredient", friendly_name(f"a{depth - 1}"), depth)
+    return [parse_time, analyze_time, output_time, repr_time, recursive_analyze_time, recursive_output_time]
+
+
+if __name__ == "__main__":
+    depths = [int(depth) for depth in sys.argv[1:]] or DEPTHS
+    columns = ["parse", "analyze", "output", "repr", "recursive analyze", "recursive output"]
+    print(f"{'depth':>8}  " + "  ".join(f"{column:>17}" for column in columns))
+    for depth in depths:
+        print(f"{depth:>8}  " + "  ".join(f"{result:>17}" for result in compile_nested(depth)))
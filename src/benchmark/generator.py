@@ -0,0 +1,72 @@
+"""
+    Seeded generator of valid CUADRO programs, used by the benchmarks.
+"""
+import random
+from typing import List
+
+from src.semantic_analyzer import Fillet, Season, Fry, Mix
+
+STEP_NAMES = [step.lexical_name() for step in (Fillet, Season, Fry, Mix)]
+UNITS = ["gr", "ml", "cu"]
+
+
+class RecipeGenerator:
+    """Generates semantically valid recipes.
+
+    Every ingredient and intermediate result is consumed at most once:
+    each cooking step takes up to `fanout` identifiers from the pool of
+    available ones and puts back the identifier it declares, so the pool
+    never runs empty. With `depth` > 1 the step is written as a chain of
+    nested calls, like `sazonar(a, filetear(b, sarten(c)))`.
+    """
+
+    def __init__(self, seed=0, ingredients=10, steps=5, fanout=3, depth=1):
+        if ingredients < 1:
+            raise ValueError("A recipe needs at least one ingredient")
+        if steps < 1:
+            raise ValueError("A recipe needs at least one cooking step")
+        self.seed = seed
+        self.ingredients = ingredients
+        self.steps = steps
+        self.fanout = max(1, fanout)
+        self.depth = max(1, depth)
+
+    def _take(self, rng: random.Random, pool: List[str]) -> List[str]:
+        args = []
+        for _ in range(min(self.fanout, len(pool))):
+            # Swap with the last element so removing it is O(1)
+            i = rng.randrange(len(pool))
+            pool[i], pool[-1] = pool[-1], pool[i]
+            args.append(pool.pop())
+        return args
+
+    def _step_call(self, rng: random.Random, args: List[str]) -> str:
+        # Each nesting level takes one argument, the innermost call takes the rest
+        parts = []
+        for level in range(self.depth - 1):
+            parts.append(rng.choice(STEP_NAMES))
+            parts.append(f"({args[level]}, " if level < len(args) else "(")
+        parts.append(f"{rng.choice(STEP_NAMES)}({', '.join(args[self.depth - 1:])})")
+        parts.append(")" * (self.depth - 1))
+        return "".join(parts)
+
+    def lines(self):
+        rng = random.Random(self.seed)
+
+        yield "# Receta Generada #\n"
+        yield "## Ingredientes ##\n"
+        pool = []
+        for i in range(self.ingredients):
+            name = f"ingrediente_{i}"
+            pool.append(name)
+            yield f"{name}={rng.randint(1, 1000)}{rng.choice(UNITS)};\n"
+
+        yield "### Pasos a seguir ###\n"
+        for i in range(self.steps):
+            args = self._take(rng, pool)
+            name = f"paso_{i}"
+            yield f"{name}={self._step_call(rng, args)};\n"
+            pool.append(name)
+
+    def generate(self) -> str:
+        return "".join(self.lines())
@@ -0,0 +1,94 @@
+"""
+Measures the hash-consed ASTs on recipes that repeat the same nested
+calls: memory kept by the ASTs, parse time, and the time of the semantic
+analysis, whose dataflow walks each distinct shared call once. Every node
+built on its own (`CuadroParser.hash_cons` False) is the baseline.
+
+Try it with `python -m src.benchmark.hash_consing`
+"""
+import random
+import time
+import tracemalloc
+
+from src.lexer import CuadroLex
+from src.parser import CuadroParser
+from src.parser.nodes import iter_nodes
+from src.semantic_analyzer import SemanticAnalyzer
+from src.benchmark.generator import STEP_NAMES, RecipeGenerator
+
+STEPS = 50_000
+DEPTH = 4
+# Distinct cooking steps in each corpus, the fewer the more repetition
+DISTINCT = [10, 1_000, 50_000]
+REPEAT = 3
+
+
+def repetitive_recipe(steps: int, distinct: int, seed=0) -> str:
+    """A recipe whose steps are drawn from `distinct` different ones.
+
+    Every step cooks a pot again, like `olla_3 = sazonar(sarten(olla_3))`,
+    declaring the pot it used, so any number of repetitions is valid.
+    """
+    rng = random.Random(seed)
+    pots = max(1, distinct // 10)
+    chains = [[rng.choice(STEP_NAMES) for _ in range(DEPTH)] for _ in range(-(-distinct // pots))]
+    lines = ["# Receta Repetida #\n", "## Ingredientes ##\n"]
+    lines.extend(f"olla_{i} = 1cu;\n" for i in range(pots))
+    lines.append("### Instrucciones ###\n")
+    for _ in range(steps):
+        pot = f"olla_{rng.randrange(pots)}"
+        chain = rng.choice(chains)
+        lines.append(f"{pot} = {'('.join(chain)}({pot}{')' * DEPTH};\n")
+    return "".join(lines)
+
+
+def parse(tokens, hash_cons):
+    psr = CuadroParser()
+    psr.hash_cons = hash_cons
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        psr.parse(iter(tokens))
+        best = min(best, time.perf_counter() - start)
+
+    # Measured apart, tracemalloc slows the parse down
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    asts = psr.parse(iter(tokens))
+    kept = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return asts, best, kept
+
+
+def analyze(asts):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        SemanticAnalyzer(asts, build_table=False).analyze()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(name, text):
+    tokens = list(CuadroLex().tokenize(text))
+    shared, shared_parse, shared_bytes = parse(tokens, True)
+    unshared, unshared_parse, unshared_bytes = parse(tokens, False)
+    total = sum(1 for _ in iter_nodes(shared))
+    distinct = len({id(node) for node in iter_nodes(shared)})
+
+    print(f"### {name}: {total} nodes, {distinct} distinct")
+    print(f"{'':>10} {'memory':>10} {'parse':>10} {'analysis':>10}")
+    for label, asts, parse_time, kept in (
+        ("unshared", unshared, unshared_parse, unshared_bytes),
+        ("shared", shared, shared_parse, shared_bytes),
+    ):
+        print(
+            f"{label:>10} {kept / 2**20:8.1f}MiB {parse_time * 1000:8.0f}ms {analyze(asts) * 1000:8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    for distinct in DISTINCT:
+        compare(f"{STEPS} steps, {distinct} distinct", repetitive_recipe(STEPS, distinct))
+    generated = RecipeGenerator(seed=0, ingredients=STEPS, steps=STEPS, fanout=3, depth=DEPTH).generate()
+    compare("RecipeGenerator, no repetition", generated)
@@ -0,0 +1,80 @@
+"""
+Replays random edits of generated recipes through an IncrementalProgram,
+like `cuadropy watch` does on every save, and compiles every version from
+scratch too. Both must give the same cooking steps and ingredients table, or
+fail, including the edits right after a failed one. Reports the time
+of both.
+
+Try it with `python -m src.benchmark.incremental_edits`
+"""
+import random
+import time
+
+from src.compiler import CuadroCompiler
+from src.incremental import IncrementalProgram
+from src.benchmark.generator import RecipeGenerator
+
+RECIPES = 20
+EDITS = 15
+
+
+def outcome(run):
+    """What `run` analyzed, as (cooking steps, ingredients table), or the
+    type of the error it raised. With several errors in the program, an
+    update can report another one first."""
+    try:
+        sem_analyzer, cooking_steps = run()
+    except Exception as e:
+        return type(e).__name__, None
+    steps = [(step.lexical_name(), [getattr(ing, "name", None) for ing in step.ingredients]) for step in cooking_steps]
+    return steps, sorted((name, ing.is_usable()) for name, ing in sem_analyzer._INGREDIENTS.items())
+
+
+def edit(rng: random.Random, lines: list):
+    i, j = rng.randrange(len(lines)), rng.randrange(len(lines))
+    op = rng.random()
+    if op < 0.3 and len(lines) > 3:
+        del lines[i]
+    elif op < 0.6:
+        lines.insert(i, lines[j])
+    else:
+        lines[i], lines[j] = lines[j], lines[i]
+
+
+if __name__ == "__main__":
+    compiler = CuadroCompiler()
+    rng = random.Random(0)
+    full_time = incremental_time = 0
+    failed = after_failure = 0
+    for seed in range(RECIPES):
+        valid = RecipeGenerator(seed=seed, ingredients=30, steps=30, fanout=2, depth=2).generate().splitlines(True)
+        program = IncrementalProgram("<edit>", compiler.lxr, compiler.parser)
+        previous_failed = False
+        for _ in range(EDITS):
+            # Every edit is made on the last version without errors, like
+            # fixing a mistake while making another edit
+            lines = list(valid)
+            edit(rng, lines)
+            text = "".join(lines)
+
+            start = time.perf_counter()
+            expected = outcome(lambda: compiler.analyze(compiler.parse("<edit>", text)))
+            full_time += time.perf_counter() - start
+
+            def update():
+                program.update(text)
+                return program.sem_analyzer, program.cooking_steps
+
+            start = time.perf_counter()
+            result = outcome(update)
+            incremental_time += time.perf_counter() - start
+
+            assert result == expected, (seed, text, expected, result)
+            after_failure += previous_failed
+            previous_failed = isinstance(expected[0], str)
+            failed += previous_failed
+            if not previous_failed:
+                valid = lines
+
+    print(f"{RECIPES * EDITS} edits, {failed} failed and {after_failure} right after a failed one")
+    print(f"full compiles {full_time * 1000:8.1f}ms  incremental updates {incremental_time * 1000:8.1f}ms")
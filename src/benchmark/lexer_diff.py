@@ -0,0 +1,97 @@
+"""
+Differential check of FastCuadroLex against the sly based CuadroLex,
+followed by a throughput comparison.
+
+Try it with `python -m src.benchmark.lexer_diff`
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+
+from src.lexer import CuadroLex, FastCuadroLex
+from .generator import RecipeGenerator
+
+NOISE = [" ", "\t", "\n", "\n\n", "  \t ", " // comentario\n", "\t// otro: ;(),\n"]
+EXTRA_LINES = [
+    "# Título con Acentos #\n",
+    "## Ingredientes á é í ó ú ##\n",
+    'nota = anotar("Texto con Ñandú y 42 numeros");\n',
+    "cantidad = .5ml;\n",
+    "otra_cantidad = 12.ml;\n",
+    "decimal = 3.75 gr;\n",
+    "grasa = 10cu;\n",
+]
+
+
+def noisy_program(seed: int) -> str:
+    """A generated recipe with random whitespace, comments and extra lines."""
+    rng = random.Random(seed)
+    program = RecipeGenerator(
+        seed=seed,
+        ingredients=rng.randint(1, 200),
+        steps=rng.randint(1, 200),
+        fanout=rng.randint(1, 8),
+        depth=rng.randint(1, 6),
+    ).generate()
+
+    parts = []
+    for line in program.splitlines(keepends=True):
+        if rng.random() < 0.1:
+            parts.append(rng.choice(EXTRA_LINES))
+        if line.startswith("#"):  # Comments or line breaks inside a header would break it
+            parts.append(line)
+            parts.append(rng.choice(NOISE))
+            continue
+        for piece in line.split(" "):
+            parts.append(piece)
+            parts.append(rng.choice(NOISE) if rng.random() < 0.3 else " ")
+    return "".join(parts)
+
+
+def token_stream(lexer, text):
+    return [(t.type, t.value, t.lineno, t.index, t.end) for t in lexer.tokenize(text)]
+
+
+def differential(runs: int) -> bool:
+    slow, fast = CuadroLex(), FastCuadroLex()
+    for seed in range(runs):
+        text = noisy_program(seed)
+        expected, got = token_stream(slow, text), token_stream(fast, text)
+        if expected != got:
+            first = next(i for i, (a, b) in enumerate(zip(expected + [None], got + [None])) if a != b)
+            print(f"Seed {seed}: token streams differ at token {first}")
+            print(f"  CuadroLex:     {expected[first] if first < len(expected) else None}")
+            print(f"  FastCuadroLex: {got[first] if first < len(got) else None}")
+            return False
+    print(f"{runs} generated programs: identical token streams")
+    return True
+
+
+def throughput(name, lexer, text, lines):
+    # The lexers print illegal characters, which isn't what we measure here
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        count = sum(1 for _ in lexer.tokenize(text))
+        elapsed = time.perf_counter() - start
+    print(f"  {name:<14} {elapsed * 1000:9.1f} ms {lines / elapsed:14,.0f} lines/s ({count} tokens)")
+
+
+if __name__ == "__main__":
+    if not differential(200):
+        sys.exit(1)
+
+    text = RecipeGenerator(seed=0, ingredients=20000, steps=20000, fanout=4, depth=3).generate()
+    lines = text.count("\n")
+    print(f"\n### Valid program ({lines} lines)")
+    throughput("CuadroLex", CuadroLex(), text, lines)
+    throughput("FastCuadroLex", FastCuadroLex(), text, lines)
+
+    rng = random.Random(0)
+    garbage = "".join(chr(rng.randrange(0x80, 0x2000)) for _ in range(20000))
+    corrupted = text[:200000] + garbage + text[200000:400000]
+    lines = corrupted.count("\n")
+    print(f"\n### Program with {len(garbage)} corrupted characters ({lines} lines)")
+    throughput("CuadroLex", CuadroLex(), corrupted, lines)
+    throughput("FastCuadroLex", FastCuadroLex(), corrupted, lines)
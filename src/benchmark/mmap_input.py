@@ -0,0 +1,92 @@
+"""
+Compares the memory-mapped input against reading the source as text, on
+big generated recipe dumps: lexing throughput and max RSS of a fresh
+process reading and lexing the whole file with each reader.
+
+    - lines: a decoded `str` per line, like `CuadroFrontend.process_file`
+    - text: the whole file decoded at once, like `CuadroFrontend.parse_file`
+    - mmap: the mapped file, like `CuadroFrontend.parse_mapped`
+
+Only lexing is measured, parsing costs the same after any of them.
+
+Try it with `python -m src.benchmark.mmap_input [size in MB...]`
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from src.benchmark.generator import RecipeGenerator
+
+SIZES_MB = [100, 300]
+READERS = ["lines", "text", "mmap"]
+
+# Run by every measured process
+MEASURE = """
+import json, mmap, resource, sys, time
+from src.lexer import FastCuadroLex
+from src.lexer.mapped_lexer import MappedCuadroLex, release_lexed
+
+reader, filename = sys.argv[1:]
+start = time.perf_counter()
+tokens = 0
+if reader == "lines":
+    lxr = FastCuadroLex()
+    with open(filename, "r") as f:
+        for lineno, line in enumerate(f, 1):
+            for _ in lxr.tokenize(line, lineno=lineno):
+                tokens += 1
+elif reader == "text":
+    with open(filename, "r") as f:
+        text = f.read()
+    for _ in FastCuadroLex().tokenize(text):
+        tokens += 1
+else:
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        for _ in release_lexed(MappedCuadroLex().tokenize(buffer), buffer):
+            tokens += 1
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, tokens]))
+"""
+
+
+def write_dump(filename: str, size: int):
+    """A recipe of about `size` bytes, repeating the steps of a generated one."""
+    program = RecipeGenerator(seed=0, ingredients=2_000, steps=2_000, fanout=3, depth=2).generate()
+    steps_start = program.index("\n###") + 1
+    steps_start = program.index("\n", steps_start) + 1
+    header, body = program[:steps_start], program[steps_start:]
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(header.replace("Generada", "Generada Año"))
+        written = len(header)
+        while written < size:
+            f.write(body)
+            written += len(body)
+
+
+def measure(reader: str, filename: str) -> list:
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, reader, filename],
+        env=dict(os.environ, PYTHONPATH=root),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES_MB
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "dump.cupy")
+        for size in sizes:
+            write_dump(filename, size * 2**20)
+            print(f"### {os.path.getsize(filename) / 2**20:.0f} MB")
+            for reader in READERS:
+                elapsed, rss, tokens = measure(reader, filename)
+                print(
+                    f"{reader:>6}  {elapsed:7.1f}s  {size / elapsed:6.1f} MB/s  "
+                    f"{rss / 1024:8.1f} MiB max RSS  {tokens} tokens"
+                )
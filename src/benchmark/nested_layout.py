@@ -0,0 +1,79 @@
+"""
+Measures the PDF layout of deeply nested cooking steps: draw calls and
+render time of the line based PdfBackend, against writing every
+indentation tab and line fragment on its own as it used to be done.
+
+Try it with `python -m src.benchmark.nested_layout`
+"""
+import time
+
+from src.backends import PdfBackend
+from src.lexer import CuadroLex
+from src.output_generator import OutputGenerator
+from src.parser import CuadroParser
+from src.semantic_analyzer import SemanticAnalyzer
+from src.benchmark.generator import RecipeGenerator
+
+DEPTHS = [1, 4, 8, 16]
+REPEAT = 3
+
+
+class FragmentPdfBackend(PdfBackend):
+    """The layout before lines were composed: a write per tab and fragment."""
+
+    def _line(self, depth, text):
+        for _ in range(depth * 8):
+            self.pdf.write(10, "\t")
+        self.pdf.write(10, text)
+        self.pdf.ln()
+
+    def title(self, text):
+        self.pdf.add_page()
+        self.pdf.set_font("Arial", size=16, style="B")
+        self.pdf.cell(0, 10, text, ln=1, align="C")
+
+    def subtitle(self, text):
+        self.pdf.set_font("Arial", size=14, style="B")
+        self.pdf.cell(0, 10, text, ln=1, align="C")
+
+
+def render(backend_class, sem_analyzer, asts, cooking_steps):
+    og = OutputGenerator(None, sem_analyzer)
+    og.backend = backend_class()
+    calls = 0
+    cell = og.backend.pdf.cell
+
+    def counted_cell(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return cell(*args, **kwargs)
+
+    og.backend.pdf.cell = counted_cell
+    start = time.perf_counter()
+    for ast in asts:
+        og.generate(ast)
+    for cs in cooking_steps:
+        og.generate(cs)
+    og.to_bytes()
+    return time.perf_counter() - start, calls
+
+
+if __name__ == "__main__":
+    lxr = CuadroLex()
+    psr = CuadroParser()
+    print(f"{'depth':>6}  {'fragments':>22}  {'lines':>22}")
+    for depth in DEPTHS:
+        program = RecipeGenerator(seed=0, ingredients=400, steps=100, fanout=3, depth=depth).generate()
+        asts = psr.parse(lxr.tokenize(program))
+
+        results = []
+        for backend_class in (FragmentPdfBackend, PdfBackend):
+            best = float("inf")
+            for _ in range(REPEAT):
+                # The analysis consumes the ingredients, so it's done again every time
+                sem_analyzer = SemanticAnalyzer(asts, build_table=False)
+                cooking_steps = sem_analyzer.analyze()
+                elapsed, calls = render(backend_class, sem_analyzer, asts, cooking_steps)
+                best = min(best, elapsed)
+            results.append(f"{best * 1000:8.1f}ms {calls:>8} calls")
+        print(f"{depth:>6}  {results[0]:>22}  {results[1]:>22}")
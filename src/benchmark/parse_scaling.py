@@ -0,0 +1,59 @@
+"""
+Checks that parsing time grows linearly with the size of the program.
+
+Try it with `python -m src.benchmark.parse_scaling`
+"""
+import sys
+import time
+
+from src.lexer import CuadroLex
+from src.parser import CuadroParser
+
+SIZES = [1_000, 10_000, 100_000]
+
+# Allowed growth of the per-item cost between the smallest and the largest size
+MAX_GROWTH = 2.5
+
+
+def program_with_expressions(n):
+    return "".join(f"ingrediente_{i}=10gr;\n" for i in range(n))
+
+
+def program_with_arguments(n):
+    args = ", ".join(f"ingrediente_{i}" for i in range(n))
+    return f"mezcla=mezclar({args});\n"
+
+
+def time_parse(lxr, psr, data):
+    tokens = list(lxr.tokenize(data))
+    start = time.perf_counter()
+    psr.parse(iter(tokens))
+    return time.perf_counter() - start
+
+
+def check_scaling(name, make_program, lxr, psr):
+    print(f"### {name}")
+    per_item = []
+    for n in SIZES:
+        elapsed = time_parse(lxr, psr, make_program(n))
+        per_item.append(elapsed / n)
+        print(f"{n:>8} items: {elapsed:8.3f}s  ({per_item[-1] * 1e6:.2f}us per item)")
+
+    growth = per_item[-1] / per_item[0]
+    print(f"per-item cost growth {SIZES[0]} -> {SIZES[-1]}: {growth:.2f}x\n")
+    return growth <= MAX_GROWTH
+
+
+if __name__ == "__main__":
+    lxr = CuadroLex()
+    psr = CuadroParser()
+
+    linear = all(
+        [
+            check_scaling("expressions", program_with_expressions, lxr, psr),
+            check_scaling("arguments", program_with_arguments, lxr, psr),
+        ]
+    )
+    if not linear:
+        print("Parsing time is not growing linearly")
+        sys.exit(1)
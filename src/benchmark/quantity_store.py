@@ -0,0 +1,76 @@
+"""
+Scales thousands of recipes by their own factor and totals the
+quantities of every ingredient per unit, object by object with Amount
+values as scripts used to, against the vectorized QuantityStore.
+
+Try it with `python -m src.benchmark.quantity_store`
+"""
+import random
+import time
+from collections import defaultdict
+
+from src.lexer import FastCuadroLex
+from src.parser import CuadroParser, NodeKind
+from src.quantities import QuantityStore
+from src.semantic_analyzer import SemanticAnalyzer
+from src.benchmark.generator import RecipeGenerator
+
+RECIPES = [1_000, 10_000]
+# Distinct generated recipes, repeated to make up the corpus
+DISTINCT = 20
+REPEAT = 3
+
+
+def corpus(size: int):
+    parser = CuadroParser()
+    distinct = [
+        parser.parse(FastCuadroLex().tokenize(RecipeGenerator(seed=seed, ingredients=50, steps=5).generate()))
+        for seed in range(DISTINCT)
+    ]
+    return [(f"receta{i}", distinct[i % DISTINCT]) for i in range(size)]
+
+
+def per_object(programs, factors):
+    analyzer = SemanticAnalyzer([], build_table=False)
+    totals = defaultdict(float)
+    for (_, asts), factor in zip(programs, factors):
+        for ast in asts:
+            if ast.kind == NodeKind.INGREDIENT_DECLARATION:
+                amount = analyzer._get_quantity(ast.quantity.value * factor, ast.quantity.unit)
+                totals[ast.name, amount.unit] += amount.value
+    return dict(totals)
+
+
+def vectorized(programs, factors):
+    return QuantityStore.from_asts(programs).scale(factors).totals()
+
+
+def best_of(function, *args):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+if __name__ == "__main__":
+    for size in RECIPES:
+        programs = corpus(size)
+        rng = random.Random(size)
+        factors = [rng.choice([0.5, 1, 2, 4]) for _ in programs]
+
+        expected, per_object_time = best_of(per_object, programs, factors)
+        totals, vectorized_time = best_of(vectorized, programs, factors)
+        store, build_time = best_of(QuantityStore.from_asts, programs)
+        _, scale_time = best_of(store.scale, factors)
+        scaled = store.scale(factors)
+        _, totals_time = best_of(scaled.totals)
+
+        assert totals.keys() == expected.keys()
+        assert all(abs(totals[key] - expected[key]) <= 1e-9 * abs(expected[key]) for key in expected)
+        print(
+            f"{size:>6} recipes {len(store):>8} rows  per object {per_object_time * 1000:8.1f}ms  "
+            f"store {vectorized_time * 1000:8.1f}ms  (build {build_time * 1000:.1f}ms, "
+            f"scale {scale_time * 1000:.1f}ms, totals {totals_time * 1000:.1f}ms)"
+        )
@@ -0,0 +1,70 @@
+"""
+Answers "which recipes use this ingredient?" over a corpus of generated
+recipes by parsing every file with the CuadroFrontend, against the
+RecipeIndex: building it, updating it with nothing or one file changed
+and querying it.
+
+Try it with `python -m src.benchmark.recipe_index [recipes...]`
+"""
+import os
+import sys
+import tempfile
+import time
+
+from src.batch import collect_sources
+from src.frontend import CuadroFrontend
+from src.index import RecipeIndex, summarize
+from src.lexer import CuadroLex
+from src.parser import CuadroParser
+from src.benchmark.generator import RecipeGenerator
+
+SIZES = [100, 1_000]
+
+
+def write_corpus(directory: str, size: int):
+    for seed in range(size):
+        program = RecipeGenerator(seed=seed, ingredients=30, steps=10, fanout=3, depth=2).generate()
+        with open(os.path.join(directory, f"receta{seed}.cupy"), "w") as f:
+            f.write(program)
+
+
+def scan(directory: str, ingredient: str):
+    """The recipes using `ingredient`, parsing every one of them."""
+    lxr, parser = CuadroLex(), CuadroParser()
+    return [
+        os.path.abspath(source)
+        for source, _ in collect_sources([directory])
+        if ingredient in summarize(CuadroFrontend(source, lxr, parser).parse_file()).ingredients
+    ]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = os.path.join(tmp, "recetas")
+            os.makedirs(corpus)
+            write_corpus(corpus, size)
+
+            with RecipeIndex(os.path.join(tmp, "recipes.idx")) as recipe_index:
+                _, build = timed(recipe_index.update, [corpus])
+                _, noop = timed(recipe_index.update, [corpus])
+                with open(os.path.join(corpus, "receta0.cupy"), "a") as f:
+                    f.write("extra = 1cu;\n")
+                _, one_changed = timed(recipe_index.update, [corpus])
+
+                ingredient = "ingrediente_0"
+                expected, scan_time = timed(scan, corpus, ingredient)
+                matches, query_time = timed(recipe_index.query, [ingredient])
+                assert [path for path, _ in matches] == sorted(expected)
+
+            print(
+                f"{size:>6} recipes  scan {scan_time * 1000:9.1f}ms  query {query_time * 1000:6.2f}ms  "
+                f"build {build * 1000:9.1f}ms  no change {noop * 1000:7.1f}ms  one changed {one_changed * 1000:7.1f}ms"
+            )
@@ -0,0 +1,90 @@
+"""
+Measures the start up of the compiler as the library of cooking steps
+grows: a fresh process compiles a recipe using one house step, with the
+steps imported lazily by the registry, against importing every step of
+the library up front.
+
+Try it with `python -m src.benchmark.step_registry`
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from src.steps import ENV_VAR
+
+SIZES = [10, 100, 1_000]
+
+RECIPE = """# Receta de la Casa #
+## Ingredientes ##
+papa = 1cu;
+### Instrucciones ###
+pure = paso_casa_0(papa);
+"""
+
+# A house step, with some code of its own like a real one would have
+STEP_MODULE = '''
+from src.semantic_analyzer import CookingStep
+
+TABLE = {{i: str(i) for i in range(200)}}
+
+
+class PasoCasa{i}(CookingStep):
+    def __init__(self, ingredients_table, ingredients):
+        super().__init__(self.__class__.__name__, ingredients_table, ingredients)
+
+    @classmethod
+    def lexical_name(cls) -> str:
+        return "paso_casa_{i}"
+'''
+
+# Run by every measured process
+MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from src.compiler import CuadroCompiler
+from src.steps import cooking_steps
+if sys.argv[1] == "eager":
+    dict(cooking_steps())
+CuadroCompiler().build(sys.argv[2])
+elapsed = time.perf_counter() - start
+imported = sum(1 for name in sys.modules if name.startswith("pasos_casa."))
+print(json.dumps([elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, imported]))
+"""
+
+
+def write_library(directory: str, size: int) -> str:
+    package = os.path.join(directory, "pasos_casa")
+    os.makedirs(package)
+    open(os.path.join(package, "__init__.py"), "w").close()
+    for i in range(size):
+        with open(os.path.join(package, f"paso_{i}.py"), "w") as f:
+            f.write(STEP_MODULE.format(i=i))
+    return ",".join(f"paso_casa_{i}=pasos_casa.paso_{i}:PasoCasa{i}" for i in range(size))
+
+
+def measure(mode: str, recipe: str, env) -> list:
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, mode, recipe], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+if __name__ == "__main__":
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    print(f"{'steps':>6}  {'lazy':>30}  {'eager':>30}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            library = os.path.join(tmp, f"library{size}")
+            steps = write_library(library, size)
+            recipe = os.path.join(tmp, "recipe.cupy")
+            with open(recipe, "w") as f:
+                f.write(RECIPE)
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, library]), **{ENV_VAR: steps})
+
+            results = []
+            for mode in ("lazy", "eager"):
+                elapsed, rss, imported = min(measure(mode, recipe, env) for _ in range(3))
+                results.append(f"{elapsed * 1000:7.0f}ms {rss / 1024:6.1f}MiB {imported:5} imported")
+            print(f"{size:>6}  {results[0]:>30}  {results[1]:>30}")
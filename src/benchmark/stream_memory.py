@@ -0,0 +1,59 @@
+"""
+Compares the peak memory of compiling a whole program at once against
+the streaming pipeline of `compile --stream`, as programs grow. Before
+that, it checks that instructions split over several lines are streamed
+like the whole program is parsed.
+
+Try it with `python -m src.benchmark.stream_memory`
+"""
+import os
+import tempfile
+import tracemalloc
+
+from src.compiler import CuadroCompiler
+from src.frontend import CuadroFrontend
+from src.semantic_analyzer import SemanticAnalyzer
+from src.benchmark.generator import RecipeGenerator
+
+SIZES = [1_000, 10_000]
+
+
+def peak(fn):
+    tracemalloc.start()
+    fn()
+    result = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+def analyze_stream(compiler, filename):
+    frontend = CuadroFrontend(filename, compiler.lxr, compiler.parser)
+    for _ in SemanticAnalyzer((), build_table=False).stream(frontend.iter_asts()):
+        pass
+
+
+def check_multiline(compiler, filename):
+    """Streams a program with every argument of its calls on its own line."""
+    program = RecipeGenerator(seed=0, ingredients=20, steps=20, fanout=3, depth=2).generate()
+    with open(filename, "w") as f:
+        f.write(program.replace(", ", ",\n    ").replace("(", "(\n    "))
+    frontend = CuadroFrontend(filename, compiler.lxr, compiler.parser)
+    assert list(frontend.iter_asts()) == frontend.parse_file()
+    analyze_stream(compiler, filename)
+
+
+if __name__ == "__main__":
+    compiler = CuadroCompiler()
+    print(f"{'lines':>8}  {'whole':>10}  {'stream':>10}  {'stream, no output':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "recipe.cupy")
+        output = os.path.join(tmp, "recipe.pdf")
+        check_multiline(compiler, source)
+        for n in SIZES:
+            with open(source, "w") as f:
+                f.write(RecipeGenerator(seed=0, ingredients=n // 2, steps=n // 2, fanout=3, depth=2).generate())
+
+            whole = peak(lambda: compiler.compile(source, output))
+            stream = peak(lambda: compiler.stream(source, output))
+            analysis = peak(lambda: analyze_stream(compiler, source))
+            print(f"{n:>8}  {whole / 2**20:8.1f}MB  {stream / 2**20:8.1f}MB  {analysis / 2**20:16.1f}MB")
@@ -0,0 +1,145 @@
+"""
+    Content addressed cache of compiled CUADRO programs.
+
+    Entries are keyed by a hash of the program source and the compiler
+    version, and live in two layers: an in-process LRU and an optional
+    on-disk directory with size based eviction.
+"""
+import os
+from collections import OrderedDict
+from typing import List, Optional
+
+import src
+
+# hashlib, pickle and tempfile are imported by the methods using them, as
+# the compiler imports CompileResult even when no cache is used
+
+ENTRY_SUFFIX = ".pickle"
+
+
+class CompileResult:
+    """Everything the compiler produces for a program.
+
+    `pdf` is the rendered document, in the output format of the compiler.
+    """
+
+    def __init__(self, asts: List, sem_analyzer, cooking_steps: List, pdf: Optional[bytes] = None):
+        self.asts = asts
+        self.sem_analyzer = sem_analyzer
+        self.cooking_steps = cooking_steps
+        self.pdf = pdf
+
+
+class CompileCache:
+    def __init__(self, directory=None, max_entries=128, max_size=512 * 1024 * 1024, store_pdf=True):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.store_pdf = store_pdf
+        self._memory: "OrderedDict[str, CompileResult]" = OrderedDict()
+        self._disk_size = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(source: str, *variant: str) -> str:
+        """The key of a program. `variant` tells apart compilations of the
+        same source that can give different results."""
+        import hashlib
+
+        digest = hashlib.sha256(src.__version__.encode())
+        for part in variant:
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def _remember(self, key: str, result: CompileResult):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CompileResult]:
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            return result
+
+        if not self.directory:
+            return None
+
+        import pickle
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            # The modification time is the recency used for eviction
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+        self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: CompileResult):
+        if not self.store_pdf and result.pdf is not None:
+            result = CompileResult(result.asts, result.sem_analyzer, result.cooking_steps)
+        self._remember(key, result)
+
+        if not self.directory:
+            return
+
+        import pickle
+        import tempfile
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            # An entry rewritten for the same key no longer takes its old size
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+
+        if self._disk_size is None:
+            self._disk_size = sum(size for _, size, _ in self._disk_entries())
+        else:
+            self._disk_size += os.path.getsize(path) - replaced
+        if self._disk_size > self.max_size:
+            self.evict()
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Removes the least recently used entries from disk until the
+        cache fits in `max_size`."""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_size = total
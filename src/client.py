@@ -0,0 +1,46 @@
+"""
+    Thin client of the local compile server (see src.server).
+
+    Kept apart from the server so it doesn't import asyncio
+    nor the compiler itself.
+"""
+import http.client
+import socket
+from typing import Tuple
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def request_compile(source: str, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None) -> Tuple[bool, bytes]:
+    """Sends a program to a running compile server.
+
+    Returns whether it compiled, along with the PDF or the diagnostics.
+    """
+    if unix_socket:
+        conn = _UnixHTTPConnection(unix_socket)
+    else:
+        conn = http.client.HTTPConnection(host, port)
+    try:
+        conn.request(
+            "POST", "/compile", body=source.encode("utf-8"),
+            headers={"Content-Type": "text/plain; charset=utf-8"},
+        )
+        response = conn.getresponse()
+        body = response.read()
+    finally:
+        conn.close()
+
+    if response.status not in (200, 422):
+        raise RuntimeError(f"Compile server answered {response.status}: {body.decode('utf-8', 'replace')}")
+    return response.status == 200, body
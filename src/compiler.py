@@ -0,0 +1,208 @@
+import os
+from typing import List, Optional, Tuple
+
+from src.frontend import CuadroFrontend
+from src.lexer import CuadroLex, FastCuadroLex
+from src.output_generator import OutputGenerator
+from src.parser import CuadroParser
+from src.profiler import NullProfiler, count_ast_nodes
+from src.semantic_analyzer import SemanticAnalyzer, CookingStep
+from src.steps import cooking_steps as step_registry
+
+# The cache, parallel parsing and worker pools are imported where they are
+# used, compiling a single program doesn't need them
+
+# Programs with fewer lines are always parsed serially
+DEFAULT_THRESHOLD = 20_000
+
+
+class CuadroCompiler:
+    """The CuadroCompiler runs the whole CUADRO pipeline for a program:
+        - Lexical and Syntax analysis (CuadroFrontend)
+        - Semantic analysis (SemanticAnalyzer)
+        - Output generation (OutputGenerator)
+
+    The lexer and parser are created once and shared by every program
+    compiled with the same instance, so a CuadroCompiler can be kept
+    warm to compile many recipes in a single process.
+
+    A `Profiler` can be given to instrument every phase of the pipeline,
+    and a `CompileCache` to skip every phase for programs already compiled.
+    With `fast_lexer` the specialized FastCuadroLex is used instead of
+    the sly based CuadroLex. `output_format` is one of the formats in
+    `src.backends.BACKENDS`, PDF unless told otherwise.
+
+    With `parse_jobs` above 1, programs of at least `parse_threshold`
+    lines are lexed and parsed in chunks on that many worker processes.
+    Smaller programs always take the serial path. With `mmap_input`
+    the files are lexed memory-mapped instead of read as text.
+    """
+
+    def __init__(
+        self, profiler=None, cache: "CompileCache" = None, fast_lexer=False, output_format="pdf",
+        parse_jobs=0, parse_threshold=DEFAULT_THRESHOLD, mmap_input=False,
+    ):
+        self.output_format = output_format
+        self.mmap_input = mmap_input
+        self.fast_lexer = fast_lexer
+        self.parse_jobs = parse_jobs
+        self.parse_threshold = parse_threshold
+        self.lxr = FastCuadroLex() if fast_lexer else CuadroLex()
+        self.parser = CuadroParser()
+        self.profiler = profiler or NullProfiler()
+        self.cache = cache
+
+    def parse(self, filename, text: str = None) -> List:
+        frontend = CuadroFrontend(filename, self.lxr, self.parser)
+        if self.parse_jobs > 1:
+            with self.profiler.phase("read"):
+                if text is None:
+                    text = frontend.read_file()
+            if text.count("\n") + 1 >= self.parse_threshold:
+                from src.parallel_parse import parse_parallel
+
+                with self.profiler.phase("parallel_parse"):
+                    asts = parse_parallel(frontend, text, self.parse_jobs, self.fast_lexer)
+                if self.profiler.enabled:
+                    self.profiler.count("ast_nodes", count_ast_nodes(asts))
+                return asts
+
+        if self.mmap_input and text is None:
+            # Lexing and parsing go together over the mapped file
+            with self.profiler.phase("mapped_parse"):
+                asts = frontend.parse_mapped()
+            if self.profiler.enabled:
+                self.profiler.count("ast_nodes", count_ast_nodes(asts))
+            return asts
+
+        if not self.profiler.enabled:
+            if text is None:
+                return frontend.parse_file()
+            return frontend.parse_tokens(self.lxr.tokenize(text))
+
+        # Lexing is done up front so its time can be told apart from parsing
+        with self.profiler.phase("read"):
+            if text is None:
+                text = frontend.read_file()
+        with self.profiler.phase("lex"):
+            tokens = list(self.lxr.tokenize(text))
+        with self.profiler.phase("parse"):
+            asts = frontend.parse_tokens(iter(tokens))
+        self.profiler.count("tokens", len(tokens))
+        self.profiler.count("ast_nodes", count_ast_nodes(asts))
+        return asts
+
+    def analyze(self, asts: List) -> Tuple[SemanticAnalyzer, List[CookingStep]]:
+        with self.profiler.phase("semantic"):
+            sem_analyzer = SemanticAnalyzer(asts, build_table=False)
+            cooking_steps = sem_analyzer.analyze()
+        self.profiler.count("ingredients", len(sem_analyzer._INGREDIENTS))
+        self.profiler.count("cooking_steps", len(cooking_steps))
+        return sem_analyzer, cooking_steps
+
+    def render(self, sem_analyzer: SemanticAnalyzer, asts: List, cooking_steps: List[CookingStep]) -> bytes:
+        with self.profiler.phase("render"):
+            og = OutputGenerator(None, sem_analyzer, output_format=self.output_format)
+            for ast in asts:
+                og.generate(ast)
+            for cs in cooking_steps:
+                og.generate(cs)
+        with self.profiler.phase("write"):
+            return og.to_bytes()
+
+    def generate(self, output, sem_analyzer: SemanticAnalyzer, asts: List, cooking_steps: List[CookingStep]):
+        pdf = self.render(sem_analyzer, asts, cooking_steps)
+        with open(output, "wb") as f:
+            f.write(pdf)
+
+    def build(self, filename, text: str = None) -> "CompileResult":
+        """Compiles the program into a CompileResult, going through the cache if any.
+
+        When `text` is given it's used as the program source instead of
+        reading `filename`, which is then only used in diagnostics.
+        """
+        from src.cache import CompileResult
+
+        if self.cache is None:
+            asts = self.parse(filename, text)
+            sem_analyzer, cooking_steps = self.analyze(asts)
+            pdf = self.render(sem_analyzer, asts, cooking_steps)
+            return CompileResult(asts, sem_analyzer, cooking_steps, pdf)
+
+        if text is None:
+            text = CuadroFrontend(filename, self.lxr, self.parser).read_file()
+        # Both lexers only differ on how they recover from lexical errors,
+        # and the classes of the cooking steps can be changed by plugins
+        key = self.cache.key(text, type(self.lxr).__name__, self.output_format, step_registry().digest())
+        result = self.cache.get(key)
+        self.profiler.count("cache_hit", int(result is not None))
+
+        if result is None:
+            asts = self.parse(filename, text)
+            sem_analyzer, cooking_steps = self.analyze(asts)
+            pdf = self.render(sem_analyzer, asts, cooking_steps)
+            result = CompileResult(asts, sem_analyzer, cooking_steps, pdf)
+            self.cache.put(key, result)
+        elif result.pdf is None:
+            # The cache was told not to keep the PDF, only the analysis
+            pdf = self.render(result.sem_analyzer, result.asts, result.cooking_steps)
+            result = CompileResult(result.asts, result.sem_analyzer, result.cooking_steps, pdf)
+        return result
+
+    def compile(self, filename, output) -> "CompileResult":
+        result = self.build(filename)
+        with open(output, "wb") as f:
+            f.write(result.pdf)
+        return result
+
+    def stream(self, filename, output) -> SemanticAnalyzer:
+        """Compiles the program while its lines are read, one at a time.
+
+        Every instruction goes from its line to the OutputGenerator before
+        the next line is read, and the output is written to disk as it's
+        generated, so neither the tokens, the ASTs, the cooking steps nor
+        the pages of the whole program are kept in memory. The first error is
+        raised without reading the rest of the file, and no output is
+        left behind. The cache is not used, as it stores the whole program.
+        """
+        frontend = CuadroFrontend(filename, self.lxr, self.parser)
+        sem_analyzer = SemanticAnalyzer((), build_table=False)
+        partial = output + ".part"
+        og = OutputGenerator(partial, sem_analyzer, stream=True, output_format=self.output_format)
+        try:
+            with self.profiler.phase("stream"):
+                for code in sem_analyzer.stream(frontend.iter_asts()):
+                    og.generate(code)
+            with self.profiler.phase("write"):
+                og.save()
+        except BaseException:
+            og.backend.discard()
+            raise
+        os.replace(partial, output)
+        return sem_analyzer
+
+
+# Each worker process of a warm pool keeps its own warm compiler
+_worker_compiler: Optional[CuadroCompiler] = None
+
+
+def _init_warm_worker(cache_dir, options):
+    from src.cache import CompileCache
+
+    global _worker_compiler
+    _worker_compiler = CuadroCompiler(cache=CompileCache(cache_dir) if cache_dir else None, **options)
+
+
+def warm_pool(workers: int, cache_dir: str = None, **options) -> "ProcessPoolExecutor":
+    """A pool of `workers` processes, each one with a CuadroCompiler built
+    with `options` when it starts, and kept for every job it runs. With a
+    `cache_dir`, the compilers share a CompileCache on that directory.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_warm_worker, initargs=(cache_dir, options))
+
+
+def worker_compiler() -> CuadroCompiler:
+    """The compiler of the warm pool worker running the job."""
+    return _worker_compiler
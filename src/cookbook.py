@@ -0,0 +1,124 @@
+"""
+    Cookbooks: many CUADRO programs in a single PDF.
+
+    Lexing, parsing and the semantic analysis of every recipe run on a
+    pool of worker processes, which lay their recipe out on a
+    RecordingBackend. A single renderer then draws every recipe on the
+    same document, after the pages of its table of contents, and fills
+    in the table once the page of every recipe is known.
+"""
+import math
+import os
+from typing import Iterable, List, NamedTuple, Optional
+
+from src.backends import PdfBackend, RecordingBackend
+from src.batch import collect_sources
+from src.compiler import warm_pool, worker_compiler
+
+DEFAULT_TITLE = "Recetario"
+
+TOC_LINE_HEIGHT = 8
+# Lines of the table of contents that fit in a page, the first one
+# loses two of them to the title of the cookbook
+TOC_LINES_PER_PAGE = 30
+
+
+class CookbookRecipe(NamedTuple):
+    source: str
+    events: List[tuple]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def title(self) -> str:
+        for method, *args in self.events:
+            if method == "title":
+                return args[0].strip()
+        return os.path.basename(self.source)
+
+
+def _layout_job(source: str) -> CookbookRecipe:
+    from src.output_generator import OutputGenerator
+
+    compiler = worker_compiler()
+    try:
+        asts = compiler.parse(source)
+        sem_analyzer, cooking_steps = compiler.analyze(asts)
+        og = OutputGenerator(None, sem_analyzer, backend=RecordingBackend())
+        for ast in asts:
+            og.generate(ast)
+        for cs in cooking_steps:
+            og.generate(cs)
+    except Exception as e:
+        return CookbookRecipe(source, [], f"{type(e).__name__}: {e}")
+    return CookbookRecipe(source, og.backend.events)
+
+
+class CookbookPdfBackend(PdfBackend):
+    def _create_pdf(self, filename, stream):
+        from src.pdf_writer import CookbookFPDF
+
+        return CookbookFPDF()
+
+
+def _toc_pages(entries: int) -> int:
+    first = TOC_LINES_PER_PAGE - 2
+    return 1 + math.ceil(max(0, entries - first) / TOC_LINES_PER_PAGE)
+
+
+def render_cookbook(recipes: List[CookbookRecipe], output: str, title: str = DEFAULT_TITLE):
+    """Draws every recipe, in order, on a single PDF with a table of contents."""
+    backend = CookbookPdfBackend(output)
+    pdf = backend.pdf
+
+    toc_pages = _toc_pages(len(recipes))
+    for _ in range(toc_pages):
+        pdf.add_page()
+
+    first_pages = []
+    for recipe in recipes:
+        # Every recipe starts with its title, on a new page
+        first_pages.append(pdf.page_no() + 1)
+        RecordingBackend.replay(recipe.events, backend)
+
+    entries = list(zip(recipes, first_pages))
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+    for page in range(1, toc_pages + 1):
+        with pdf.on_page(page):
+            lines = TOC_LINES_PER_PAGE
+            if page == 1:
+                pdf.set_font("Arial", size=16, style="B")
+                pdf.cell(0, 2 * TOC_LINE_HEIGHT, title, ln=1, align="C")
+                lines -= 2
+            pdf.set_font("Arial", size=12)
+            for recipe, first_page in entries[:lines]:
+                pdf.cell(width - 20, TOC_LINE_HEIGHT, recipe.title)
+                pdf.cell(20, TOC_LINE_HEIGHT, str(first_page), ln=1, align="R")
+            entries = entries[lines:]
+
+    backend.save()
+
+
+def compile_cookbook(
+    paths: Iterable[str], output: str, jobs: int = None, title: str = DEFAULT_TITLE, fast_lexer: bool = False
+) -> List[CookbookRecipe]:
+    """Compiles every program found in `paths` into a single cookbook PDF.
+
+    The recipes are laid out in parallel, and returned in the same order
+    they were found. If any of them fails, no cookbook is written.
+    """
+    sources = [source for source, _ in collect_sources(paths)]
+    if not sources:
+        return []
+
+    jobs = min(jobs or os.cpu_count() or 1, len(sources))
+    chunksize = max(1, len(sources) // (jobs * 4))
+    with warm_pool(jobs, fast_lexer=fast_lexer) as executor:
+        recipes = list(executor.map(_layout_job, sources, chunksize=chunksize))
+
+    if all(recipe.ok for recipe in recipes):
+        render_cookbook(recipes, output, title)
+    return recipes
@@ -0,0 +1,121 @@
+"""
+    Ingredient dataflow of a CUADRO program.
+
+    Every declared ingredient and every intermediate produced by a cooking
+    step gets an integer id, in declaration order. A single pass over the
+    program follows which step produces and which steps consume each id,
+    keeping the ids still available in a bitset, so a recipe with thousands
+    of ingredients is validated with a constant amount of work per use.
+"""
+from typing import Dict, Iterator, List, Tuple
+
+from src.parser.nodes import NodeKind, iter_nodes
+
+# Producer of the ids that are declared as ingredients
+DECLARED = -1
+# Consumer of the ids that are never used
+UNUSED = -1
+
+
+class IngredientFlow:
+    """Producer/consumer edges between the ingredients of a program.
+
+    `names[id]` is the identifier of each id, and `producer[id]` and
+    `consumer[id]` are the indexes of the cooking steps that produce and
+    first consume it (DECLARED and UNUSED otherwise). Uses of an id after
+    it was consumed are listed in `double_used`, and uses of names that
+    were never declared in `undeclared`, as (name, step) pairs.
+    """
+
+    def __init__(self, asts: List = ()):
+        self.names: List[str] = []
+        self.producer: List[int] = []
+        self.consumer: List[int] = []
+        self.double_used: List[Tuple[str, int]] = []
+        self.undeclared: List[Tuple[str, int]] = []
+        self.steps = 0
+        self._ids = {}  # Current id of every name, a step can declare a name again
+        self._available = bytearray()  # One bit per id, set while it can still be used
+        self._uses: Dict[int, tuple] = {}  # Identifiers used by every shared call
+        for ast in asts:
+            self.add(ast)
+
+    def _declare(self, name: str, producer: int):
+        i = len(self.names)
+        self.names.append(name)
+        self.producer.append(producer)
+        self.consumer.append(UNUSED)
+        if i >> 3 == len(self._available):
+            self._available.append(0)
+        self._available[i >> 3] |= 1 << (i & 7)
+        self._ids[name] = i
+
+    def _shared_identifiers(self, call) -> List[str]:
+        """The identifiers used by a call the parser shared, and the ones
+        nested in it, in order. They are only worked out once."""
+        entry = self._uses.get(id(call))
+        if entry is not None:
+            return entry[1]
+
+        names = [node.name for node in iter_nodes((call,)) if node.kind == NodeKind.IDENTIFIER]
+        # The node is kept so its id is not reused
+        self._uses[id(call)] = (call, names)
+        return names
+
+    def _use(self, name: str, step: int):
+        i = self._ids.get(name)
+        if i is None:
+            self.undeclared.append((name, step))
+        elif self._available[i >> 3] & (1 << (i & 7)):
+            self._available[i >> 3] &= ~(1 << (i & 7))
+            self.consumer[i] = step
+        else:
+            self.double_used.append((name, step))
+
+    def add(self, ast):
+        """Follows the ingredients of the next instruction of the program."""
+        if ast.kind == NodeKind.INGREDIENT_DECLARATION:
+            self._declare(ast.name, DECLARED)
+        elif ast.kind == NodeKind.FUNCTION_BASED_DECLARATION:
+            step = self.steps
+            if ast.call.shared:
+                for name in self._shared_identifiers(ast.call):
+                    self._use(name, step)
+            else:
+                stack = [ast.call]
+                while stack:
+                    node = stack.pop()
+                    if node.kind == NodeKind.FUNCTION_CALL:
+                        stack.extend(reversed(node.args))
+                    elif node.kind == NodeKind.IDENTIFIER:
+                        self._use(node.name, step)
+            self._declare(ast.name, step)
+            self.steps += 1
+
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        """(producer, consumer) pairs of cooking steps linked by an intermediate."""
+        for producer, consumer in zip(self.producer, self.consumer):
+            if producer != DECLARED and consumer != UNUSED:
+                yield producer, consumer
+
+    def unused(self) -> List[int]:
+        """Ids never consumed. The result of the last step is the dish itself."""
+        last = self.steps - 1
+        return [
+            i
+            for i, (producer, consumer) in enumerate(zip(self.producer, self.consumer))
+            if consumer == UNUSED and (producer != last or producer == DECLARED)
+        ]
+
+    def warnings(self) -> List[str]:
+        warnings = []
+        for i in self.unused():
+            if self.producer[i] == DECLARED:
+                warnings.append(f"Ingredient {self.names[i]} is declared but never used")
+            else:
+                warnings.append(f"The result {self.names[i]} of cooking step {self.producer[i] + 1} is never used")
+        # Uses in a later step are already errors, but an ingredient
+        # given twice to the same step is only caught here
+        for name, step in self.double_used:
+            warnings.append(f"Ingredient {name} is used again by cooking step {step + 1}")
+        return warnings
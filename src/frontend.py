@@ -1,9 +1,21 @@
-from typing import List
+import mmap
+import os
+from typing import Iterator, List
 
 from src.lexer import CuadroLex
+from src.lexer.mapped_lexer import MappedCuadroLex, MappedLexError, release_lexed
 from src.parser import CuadroParser
 
 
+def ends_instruction(line: str) -> bool:
+    """Whether the line completes an instruction: it ends with `;` or is a
+    whole header. Neither `;` nor `#` can be part of a string, so a line
+    is never taken for the end of an instruction it's in the middle of.
+    """
+    line = line.split("//")[0].strip()
+    return line.endswith(";") or line.startswith("#") and line.endswith("#")
+
+
 class CuadroFrontend:
     """The CuadroFrontend will be in charge of
     processing the input file and communicate:
@@ -13,10 +25,10 @@ class CuadroFrontend:
     If everything is OK, it will pass the in-memory
     information to the Semantic Analysis module.
     """
-    def __init__(self, filename):
+    def __init__(self, filename, lxr: CuadroLex = None, parser: CuadroParser = None):
         self.filename = filename
-        self.lxr = CuadroLex()
-        self.parser = CuadroParser()
+        self.lxr = lxr or CuadroLex()
+        self.parser = parser or CuadroParser()
 
     def process_file(self):
         tokens = []
@@ -39,3 +51,81 @@ class CuadroFrontend:
             ast = self.parser.parse(tok)
             asts.append(ast[0])
         return asts
+
+    def read_file(self) -> str:
+        with open(self.filename, "r") as f:
+            return f.read()
+
+    def parse_tokens(self, tokens) -> List:
+        try:
+            asts = self.parser.parse(tokens)
+        except SyntaxError as e:
+            raise SyntaxError(f"Unable to parse the program {self.filename}. {e}") from None
+        if asts is None:
+            raise SyntaxError(f"Unable to parse the program {self.filename}")
+        return asts
+
+    def parse_file(self) -> List:
+        """Lexes and parses the whole file in a single pass.
+
+        Instead of parsing each line on its own (`process_file` followed by
+        `generate_asts`), the token stream of the whole program is handed
+        to the parser once, using the `cuadro : expressions` start rule.
+        """
+        return self.parse_tokens(self.lxr.tokenize(self.read_file()))
+
+    def parse_mapped(self) -> List:
+        """Lexes and parses the file memory-mapped, as UTF-8.
+
+        The lexer scans the mapped file in place, and only the token values
+        are decoded, so the source is never held in memory as a `str`, and
+        the pages already lexed are released as it goes. When
+        the file has anything the MappedCuadroLex can't lex, it's parsed
+        again with `parse_file`, so diagnostics are the ones of the lexer
+        of the frontend.
+        """
+        if os.path.getsize(self.filename) == 0:  # Empty files can't be mapped
+            return self.parse_file()
+        try:
+            with open(self.filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                tokens = MappedCuadroLex().tokenize(buffer)
+                try:
+                    return self.parse_tokens(release_lexed(tokens, buffer))
+                finally:
+                    # An error keeps the lexer alive, and the map can't be closed while it scans it
+                    tokens.close()
+        except MappedLexError:
+            return self.parse_file()
+
+    def parse_line(self, lineno: int, line: str) -> List:
+        """Lexes and parses a single line, or the lines of an instruction,
+        the first one numbered `lineno` in the file."""
+        tokens = list(self.lxr.tokenize(line, lineno=lineno))
+        if not tokens:  # Blank or comment only line
+            return []
+        try:
+            asts = self.parser.parse(iter(tokens))
+        except SyntaxError as e:
+            raise SyntaxError(f"Unable to parse line {lineno} of {self.filename}. {e}") from None
+        if asts is None:
+            raise SyntaxError(f"Unable to parse line {lineno} of {self.filename}")
+        return asts
+
+    def iter_asts(self) -> Iterator:
+        """Yields the instructions of the file as its lines are read.
+
+        Lines are kept until they complete an instruction, which is parsed
+        on its own, so only the instruction being parsed is kept in memory,
+        and a syntax error is raised without reading the rest of the file.
+        """
+        pending = []
+        with open(self.filename, "r") as f:
+            for lineno, line in enumerate(f, 1):
+                if not pending:
+                    first = lineno
+                pending.append(line)
+                if ends_instruction(line):
+                    yield from self.parse_line(first, "".join(pending))
+                    pending = []
+        if pending:  # Blank lines, comments or an instruction left open
+            yield from self.parse_line(first, "".join(pending))
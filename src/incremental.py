@@ -0,0 +1,147 @@
+"""
+    Incremental recompilation of CUADRO programs.
+
+    CUADRO is line oriented: every logical line is an independent `expr`,
+    so after an edit only the changed lines have to be lexed and parsed
+    again, and the cooking steps only have to be re-analyzed from the
+    first affected instruction onward.
+"""
+from typing import List, Optional
+
+from src.frontend import CuadroFrontend
+from src.lexer import CuadroLex
+from src.parser import CuadroParser, NodeKind
+from src.semantic_analyzer import SemanticAnalyzer, CookingStep, Ingredient
+
+
+def _consumed_ingredients(step: CookingStep) -> List[Ingredient]:
+    """The ingredients marked as used by `step.do()`."""
+    consumed = []
+    stack = [step]
+    while stack:
+        for ing in stack.pop().ingredients:
+            if isinstance(ing, Ingredient):
+                consumed.append(ing)
+            elif isinstance(ing, CookingStep):
+                stack.append(ing)
+    return consumed
+
+
+class UpdateStats:
+    def __init__(self, reparsed_lines: int, first_affected: Optional[int], full_analysis: bool):
+        # Number of physical lines lexed and parsed again
+        self.reparsed_lines = reparsed_lines
+        # Index of the first instruction whose AST changed, None if none did
+        self.first_affected = first_affected
+        self.full_analysis = full_analysis
+
+
+class IncrementalProgram:
+    """Keeps the per-line ASTs and the semantic state of a program between edits.
+
+    Every physical line is expected to hold complete instructions, which is
+    how CUADRO programs are written.
+
+    For every cooking step the analyzer processed, an undo record is kept
+    with the ingredients it consumed and the identifier it (re)declared,
+    so the ingredients table can be rolled back to the state right before
+    any instruction.
+    """
+
+    def __init__(self, filename, lxr: CuadroLex = None, parser: CuadroParser = None):
+        self.filename = filename
+        self.lxr = lxr or CuadroLex()
+        self.parser = parser or CuadroParser()
+        self._frontend = CuadroFrontend(filename, self.lxr, self.parser)
+
+        self.lines: List[str] = []
+        self.line_asts: List[List] = []
+        self.asts: List = []
+
+        self.sem_analyzer: Optional[SemanticAnalyzer] = None
+        self.cooking_steps: List[CookingStep] = []
+        self._undo: List = []
+        # Whether the last update completed without errors
+        self._valid = False
+
+    def _parse_line(self, lineno: int, line: str) -> List:
+        return self._frontend.parse_line(lineno, line)
+
+    def _first_step_index(self, asts: List) -> int:
+        for i, ast in enumerate(asts):
+            if ast.kind == NodeKind.FUNCTION_BASED_DECLARATION:
+                return i
+        return len(asts)
+
+    def _rollback(self, keep: int):
+        """Undoes the cooking steps after the first `keep` ones."""
+        while len(self.cooking_steps) > keep:
+            self.cooking_steps.pop()
+            consumed, name, previous = self._undo.pop()
+            for ing in consumed:
+                ing._usable = True
+            if previous is None:
+                del self.sem_analyzer._INGREDIENTS[name]
+            else:
+                self.sem_analyzer._INGREDIENTS[name] = previous
+
+    def _process_steps(self, start: int):
+        table = self.sem_analyzer._INGREDIENTS
+        for ast in self.asts[start:]:
+            previous = table.get(ast.name)
+            step = self.sem_analyzer.process_cooking_step(ast)
+            self.cooking_steps.append(step)
+            self._undo.append((_consumed_ingredients(step), ast.name, previous))
+
+    def update(self, text: str) -> UpdateStats:
+        new_lines = text.splitlines(keepends=True)
+        old_lines = self.lines
+
+        # Unchanged lines at the start and at the end of the file
+        prefix = 0
+        limit = min(len(old_lines), len(new_lines))
+        while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < limit - prefix
+            and old_lines[len(old_lines) - 1 - suffix] == new_lines[len(new_lines) - 1 - suffix]
+        ):
+            suffix += 1
+
+        changed = [
+            self._parse_line(prefix + i + 1, line)
+            for i, line in enumerate(new_lines[prefix:len(new_lines) - suffix])
+        ]
+        old_changed = self.line_asts[prefix:len(self.line_asts) - suffix]
+        self.lines = new_lines
+        self.line_asts = self.line_asts[:prefix] + changed + self.line_asts[len(self.line_asts) - suffix:]
+
+        first_affected = sum(len(asts) for asts in self.line_asts[:prefix])
+        same_instructions = [ast for asts in changed for ast in asts] == [ast for asts in old_changed for ast in asts]
+        was_valid = self._valid
+        if same_instructions and was_valid:
+            return UpdateStats(len(changed), None, False)
+        self._valid = False
+
+        self.asts = [ast for asts in self.line_asts for ast in asts]
+        first_step = self._first_step_index(self.asts)
+
+        # After a failed update the semantic state is only known to be
+        # right up to the step that failed, so it's built again
+        full_analysis = self.sem_analyzer is None or not was_valid or first_affected < first_step
+        if full_analysis:
+            self.sem_analyzer = None
+            self.cooking_steps = []
+            self._undo = []
+            self.sem_analyzer = SemanticAnalyzer(self.asts)
+            keep = 0
+        else:
+            keep = min(first_affected - first_step, len(self.cooking_steps))
+            self._rollback(keep)
+            self.sem_analyzer.asts = self.asts
+
+        self.sem_analyzer.validate_ast()
+        self._process_steps(first_step + keep)
+        self._valid = True
+        return UpdateStats(len(changed), first_affected, full_analysis)
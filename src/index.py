@@ -0,0 +1,207 @@
+"""
+    Persistent index of a corpus of CUADRO programs.
+
+    Every program is parsed once, and the recipes using each ingredient,
+    the recipes calling each cooking step and the title of every file are
+    kept in a SQLite database. Updating the index only parses again the
+    files whose modification time or size changed and whose content hash
+    doesn't match anymore, and queries never go through the parser.
+"""
+import hashlib
+import os
+import sqlite3
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+import src
+
+DEFAULT_INDEX = "recipes.idx"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest BLOB NOT NULL,
+    title TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS files_title ON files (title COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS ingredients (
+    name TEXT NOT NULL,
+    file INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    PRIMARY KEY (name, file)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS steps (
+    name TEXT NOT NULL,
+    file INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    PRIMARY KEY (name, file)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ingredients_file ON ingredients (file);
+CREATE INDEX IF NOT EXISTS steps_file ON steps (file);
+"""
+
+
+class IndexStats(NamedTuple):
+    parsed: int
+    unchanged: int
+    removed: int
+    # (path, error) of the files that could not be parsed
+    errors: List[tuple]
+
+
+class ProgramSummary(NamedTuple):
+    title: Optional[str]
+    ingredients: Set[str]
+    steps: Set[str]
+
+
+def summarize(asts: List) -> ProgramSummary:
+    """What the index keeps of a program."""
+    from src.parser.nodes import NodeKind, iter_nodes
+
+    title = None
+    ingredients = set()
+    steps = set()
+    for node in iter_nodes(asts):
+        if node.kind == NodeKind.TITLE_HEADER and title is None:
+            title = node.text.strip()
+        elif node.kind == NodeKind.INGREDIENT_DECLARATION:
+            ingredients.add(node.name)
+        elif node.kind == NodeKind.FUNCTION_CALL:
+            steps.add(node.name)
+    return ProgramSummary(title, ingredients, steps)
+
+
+class RecipeIndex:
+    """The index stored at `filename`, created if it doesn't exist.
+
+    Files are stored by absolute path. An index written by another version
+    of the compiler is stale, as its parser could read programs differently:
+    it can't be queried, and updating it parses every file again. Files
+    that failed to parse are parsed again on every update, so their error
+    is reported again until they are fixed.
+    """
+
+    def __init__(self, filename=DEFAULT_INDEX, fast_lexer=False):
+        self.filename = filename
+        self.fast_lexer = fast_lexer
+        self._lxr = None
+        self._parser = None
+        self.db = sqlite3.connect(filename)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        self.version = version[0] if version is not None else None
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _parse(self, path: str, source: bytes) -> ProgramSummary:
+        # The parser is only imported and created when a file has to be
+        # parsed, queries never load it
+        from src.frontend import CuadroFrontend
+        from src.lexer import CuadroLex, FastCuadroLex
+        from src.parser import CuadroParser
+
+        if self._parser is None:
+            self._lxr = FastCuadroLex() if self.fast_lexer else CuadroLex()
+            self._parser = CuadroParser()
+        frontend = CuadroFrontend(path, self._lxr, self._parser)
+        return summarize(frontend.parse_tokens(self._lxr.tokenize(source.decode("utf-8"))))
+
+    def _index_file(self, path: str, stat: os.stat_result, source: bytes, digest: bytes):
+        try:
+            summary = self._parse(path, source)
+            error = None
+        except Exception as e:
+            summary = ProgramSummary(None, set(), set())
+            error = f"{type(e).__name__}: {e}"
+            # Never matching what's on disk, the file is parsed again by the next update
+            mtime_ns, size, digest = 0, -1, b""
+        else:
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+
+        self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+        file_id = self.db.execute(
+            "INSERT INTO files (path, mtime_ns, size, digest, title, error) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, digest, summary.title, error),
+        ).lastrowid
+        self.db.executemany("INSERT INTO ingredients VALUES (?, ?)", ((name, file_id) for name in summary.ingredients))
+        self.db.executemany("INSERT INTO steps VALUES (?, ?)", ((name, file_id) for name in summary.steps))
+        return error
+
+    def update(self, paths: Iterable[str]) -> IndexStats:
+        """Makes the index hold exactly the programs in `paths` (files,
+        directories or globs), parsing only the new and changed ones."""
+        from src.batch import collect_sources
+
+        if self.version != src.__version__:
+            with self.db:
+                self.db.execute("DELETE FROM files")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (src.__version__,))
+            self.version = src.__version__
+
+        known = {
+            path: (mtime_ns, size, digest)
+            for path, mtime_ns, size, digest in self.db.execute("SELECT path, mtime_ns, size, digest FROM files")
+        }
+        parsed = unchanged = 0
+        errors = []
+        seen = set()
+        with self.db:
+            for source, _ in collect_sources(paths):
+                path = os.path.abspath(source)
+                seen.add(path)
+                stat = os.stat(path)
+                previous = known.get(path)
+                if previous is not None and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                    unchanged += 1
+                    continue
+
+                with open(path, "rb") as f:
+                    content = f.read()
+                digest = hashlib.sha256(content).digest()
+                if previous is not None and previous[2] == digest:
+                    # Touched or copied over, but the same program
+                    self.db.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (stat.st_mtime_ns, stat.st_size, path)
+                    )
+                    unchanged += 1
+                    continue
+
+                error = self._index_file(path, stat, content, digest)
+                parsed += 1
+                if error is not None:
+                    errors.append((path, error))
+
+            removed = [(path,) for path in known if path not in seen]
+            self.db.executemany("DELETE FROM files WHERE path = ?", removed)
+        return IndexStats(parsed, unchanged, len(removed), errors)
+
+    def query(self, ingredients: Iterable[str] = (), steps: Iterable[str] = (), title: str = None) -> List[tuple]:
+        """The (path, title) of the files using every ingredient in
+        `ingredients`, calling every step in `steps` and whose title
+        contains `title`, ignoring case."""
+        if self.version != src.__version__:
+            raise RuntimeError(f"The index {self.filename} is stale, build it again with this version of cuadropy")
+        conditions = []
+        params = []
+        for name in ingredients:
+            conditions.append("id IN (SELECT file FROM ingredients WHERE name = ?)")
+            params.append(name)
+        for name in steps:
+            conditions.append("id IN (SELECT file FROM steps WHERE name = ?)")
+            params.append(name)
+        if title is not None:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            params.append("%" + title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        where = " AND ".join(conditions) or "1"
+        return self.db.execute(f"SELECT path, title FROM files WHERE {where} ORDER BY path", params).fetchall()
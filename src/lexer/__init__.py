@@ -1 +1,2 @@
 from .lexer import CuadroLex
+from .fast_lexer import FastCuadroLex
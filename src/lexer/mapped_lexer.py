@@ -0,0 +1,125 @@
+"""
+    A lexer for CUADRO sources kept as bytes, like a memory-mapped file.
+
+    It scans the buffer in place with the patterns of CuadroLex compiled
+    for UTF-8 bytes, and only decodes the slices that become token values:
+    identifiers, strings and headers. Numbers are converted straight from
+    their bytes, and the rest of the tokens have a fixed value.
+
+    The byte patterns only know the ASCII whitespace and digits and the
+    À-ÿ letters of CuadroLex. Any byte they don't match raises
+    MappedLexError, and the source has to be lexed again as text, which
+    reports lexical errors and accepts the rest of the Unicode whitespace
+    and digits. Invalid UTF-8 inside a comment is not noticed.
+"""
+import mmap
+import re
+from typing import Iterator
+
+from .fast_lexer import FastToken, TOKEN_RULES, _pattern
+from .lexer import CuadroLex
+
+# Bytes lexed between releases of the pages already lexed
+RELEASE_WINDOW = 16 * 2**20
+
+# The two bytes of every character from À to ÿ in UTF-8
+_LATIN1_LETTER = rb"\xc3[\x80-\xbf]"
+_CLASS_WITH_LATIN1 = re.compile(r"\[([^\]]*)À-ÿ([^\]]*)\]")
+
+# Tokens whose value is always the same
+_FIXED_VALUES = {
+    "END_LINE": ";",
+    "ASSIGN": "=",
+    "COMMA": ",",
+    "OPEN_PARENT": "(",
+    "CLOSE_PARENT": ")",
+    "OPEN_SQUARE_BRACKETS": "[",
+    "CLOSE_SQUARE_BRACKETS": "]",
+    "MLTS_UNIT": "ml",
+    "GR_UNIT": "gr",
+    "CARDINAL_UNIT": "cu",
+}
+
+
+def _bytes_pattern(pattern: str) -> bytes:
+    """`pattern` for UTF-8 bytes: each class with À-ÿ also takes their two bytes."""
+    pattern = _CLASS_WITH_LATIN1.sub(lambda m: f"(?:[{m.group(1)}{m.group(2)}]|{_LATIN1_LETTER.decode()})", pattern)
+    return pattern.encode("ascii")
+
+
+def _master_pattern():
+    parts = [b"(?P<ignore>[" + re.escape(CuadroLex.ignore).encode() + b"])"]
+    parts += [b"(?P<" + name.encode() + b">" + _bytes_pattern(_pattern(getattr(CuadroLex, name))) + b")" for name in TOKEN_RULES]
+    parts += [
+        b"(?P<newline>" + _bytes_pattern(_pattern(CuadroLex.ignore_newline)) + b")",
+        b"(?P<whitespaces>" + _bytes_pattern(CuadroLex.ignore_whitespaces) + b")",
+        b"(?P<comments>" + _bytes_pattern(CuadroLex.ignore_comments) + b")",
+        b"(?P<error>(?s:.))",
+    ]
+    return re.compile(b"|".join(parts))
+
+
+class MappedLexError(ValueError):
+    """The buffer has a byte the byte patterns can't lex, at `lineno` and byte `index`."""
+
+    def __init__(self, lineno: int, index: int):
+        super().__init__(f"Unable to lex byte {index} at line {lineno} without decoding")
+        self.lineno = lineno
+        self.index = index
+
+
+class MappedCuadroLex:
+    """Lexes a bytes-like buffer, without copying it, into FastTokens.
+
+    The `index` and `end` of the tokens are byte offsets in the buffer.
+    """
+
+    _master_re = _master_pattern()
+    _skipped = frozenset(["ignore", "whitespaces", "comments"])
+    _decoded = frozenset(["IDENTIFIER", "STRING", "HEADER"])
+
+    def tokenize(self, buffer, lineno: int = 1, index: int = 0, end: int = None):
+        """Yields the tokens of `buffer[index:end]`, which starts at line `lineno`."""
+        skipped = self._skipped
+        decoded = self._decoded
+        end = len(buffer) if end is None else end
+        for m in self._master_re.finditer(buffer, index, end):
+            kind = m.lastgroup
+            if kind in skipped:
+                continue
+            if kind == "newline":
+                lineno += m.end() - m.start()
+                continue
+            if kind == "error":
+                raise MappedLexError(lineno, m.start())
+
+            if kind in decoded:
+                value = m.group().decode("utf-8")
+            elif kind == "INTEGER":
+                value = int(m.group())
+            elif kind == "FLOAT":
+                value = float(m.group())
+            else:
+                value = _FIXED_VALUES[kind]
+            yield FastToken(kind, value, lineno, m.start(), m.end())
+
+
+def release_lexed(tokens: Iterator[FastToken], buffer: mmap.mmap, window: int = RELEASE_WINDOW):
+    """Yields the tokens of a mapped file, releasing the pages left behind.
+
+    The mapping is only read forward, so every `window` bytes the pages
+    before the last token are dropped from the memory of the process. They
+    stay in the page cache, and the maximum resident memory doesn't grow
+    with the size of the file.
+    """
+    if not hasattr(mmap, "MADV_DONTNEED"):  # Not on every platform
+        yield from tokens
+        return
+
+    released = 0
+    for token in tokens:
+        if token.index - released >= window:
+            end = token.index - token.index % mmap.PAGESIZE
+            buffer.madvise(mmap.MADV_DONTNEED, released, end - released)
+            released = end
+        yield token
@@ -1,48 +1,234 @@
-import pprint
 import click
-from src.frontend import CuadroFrontend
-from src.output_generator import OutputGenerator
-from src.semantic_analyzer import SemanticAnalyzer
-from src.parser import CuadroParser
 
+from src.backends import BACKENDS
 
-@click.command()
+# The compiler modules are imported by the commands that need them,
+# keeping the start up of the CLI short.
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command("compile")
 @click.argument("filename", type=click.Path(exists=True))
-def run(filename):
-    tokens = CuadroFrontend(filename).process_file()
-    asts = CuadroFrontend(filename).generate_asts(tokens)
+@click.option("-o", "--output", type=click.Path(dir_okay=False),
+              help="Defaults to out.pdf, or out with the extension of the output format.")
+@click.option("-f", "--format", "output_format", type=click.Choice(list(BACKENDS)), default="pdf", show_default=True)
+@click.option("--profile", is_flag=True, help="Report time per phase and counters on stderr.")
+@click.option("--profile-format", type=click.Choice(["text", "json"]), default="text", show_default=True)
+@click.option("--cache-dir", envvar="CUADROPY_CACHE_DIR", type=click.Path(file_okay=False),
+              help="Reuse compilations of unchanged programs stored in this directory.")
+@click.option("--fast-lexer", is_flag=True, help="Use the specialized lexer instead of the sly one.")
+@click.option("--stream", is_flag=True,
+              help="Compile line by line in bounded memory, stopping at the first error. "
+                   "The ASTs and the ingredients table are not printed.")
+@click.option("--parse-jobs", type=int, default=0,
+              help="Parse big programs in chunks on this many worker processes.")
+@click.option("--parse-threshold", type=int, default=20_000, show_default=True,
+              help="Lines from which a program is parsed in chunks, with --parse-jobs.")
+@click.option("--mmap", "mmap_input", is_flag=True,
+              help="Lex the program memory-mapped, decoding only the token values. UTF-8 only.")
+def run(filename, output, output_format, profile, profile_format, cache_dir, fast_lexer, stream,
+        parse_jobs, parse_threshold, mmap_input):
+    import pprint
+    from src.compiler import CuadroCompiler
+    from src.profiler import Profiler
+
+    profiler = Profiler() if profile else None
+    cache = None
+    if cache_dir:
+        from src.cache import CompileCache
+
+        cache = CompileCache(cache_dir)
+    compiler = CuadroCompiler(
+        profiler, cache, fast_lexer, output_format, parse_jobs, parse_threshold, mmap_input
+    )
+    output = output or "out" + BACKENDS[output_format].extension
+
+    if stream:
+        sem_analyzer = compiler.stream(filename, output)
+        for warning in sem_analyzer.warnings:
+            click.echo(f"Warning: {warning}", err=True)
+        print("Output has been generated")
+        if profiler:
+            click.echo(profiler.format(profile_format), err=True)
+        return
+
+    result = compiler.build(filename)
 
     print("Program ASTS: ")
-    for ast in asts:
+    for ast in result.asts:
         print(ast)
 
     print("\n")
-    # Parse ingredients declaration
     pp = pprint.PrettyPrinter(indent=4)
-    sem_analyzer = SemanticAnalyzer(asts)
     print("Ingredients identifiers table: ")
-    pp.pprint(sem_analyzer._INGREDIENTS)
+    pp.pprint(result.sem_analyzer._INGREDIENTS)
 
-    sem_analyzer.validate_ast()
-
-    # We can start to semantically evaluate the instructions,
-    # And maybe even generate the output code.
-    cooking_steps = []
-    for ast in asts:
-        if ast[0] == CuadroParser.AST_NODE_FUNCTION_BASED_DECLARATION:
-            cooking_steps.append(sem_analyzer.process_cooking_step(ast))
+    for warning in result.sem_analyzer.warnings:
+        click.echo(f"Warning: {warning}", err=True)
 
     print("Semantic Analysis completed. Let's generate output")
 
-    og = OutputGenerator("out.pdf", sem_analyzer)
-
-    for ast in asts:
-        og.generate(ast)
-    for cs in cooking_steps:
-        og.generate(cs)
-    og.write()
+    with open(output, "wb") as f:
+        f.write(result.pdf)
     print("Output has been generated")
 
+    if profiler:
+        click.echo(profiler.format(profile_format), err=True)
+
+
+@cli.command()
+@click.argument("paths", nargs=-1, required=True)
+@click.option("-o", "--output-dir", default="out", type=click.Path(file_okay=False), show_default=True)
+@click.option("-j", "--jobs", type=int, default=None, help="Worker processes. Defaults to the number of CPUs.")
+@click.option("--cache-dir", envvar="CUADROPY_CACHE_DIR", type=click.Path(file_okay=False),
+              help="Reuse compilations of unchanged programs stored in this directory.")
+@click.option("--fast-lexer", is_flag=True, help="Use the specialized lexer instead of the sly one.")
+@click.option("-f", "--format", "output_format", type=click.Choice(list(BACKENDS)), default="pdf", show_default=True)
+def batch(paths, output_dir, jobs, cache_dir, fast_lexer, output_format):
+    """Compiles every program in PATHS (files, directories or globs)."""
+    from src.batch import compile_batch
+
+    results = compile_batch(paths, output_dir, jobs, cache_dir, fast_lexer, output_format)
+    if not results:
+        raise click.ClickException("No CUADRO programs were found")
+
+    failed = 0
+    for result in results:
+        if result.ok:
+            print(f"OK    {result.source} -> {result.output}")
+        else:
+            failed += 1
+            print(f"ERROR {result.source}: {result.error}")
+
+    print(f"\n{len(results) - failed} compiled, {failed} failed")
+    if failed:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument("paths", nargs=-1, required=True)
+@click.option("-o", "--output", default="cookbook.pdf", type=click.Path(dir_okay=False), show_default=True)
+@click.option("-j", "--jobs", type=int, default=None, help="Worker processes. Defaults to the number of CPUs.")
+@click.option("--title", default="Recetario", show_default=True, help="Title of the table of contents.")
+@click.option("--fast-lexer", is_flag=True, help="Use the specialized lexer instead of the sly one.")
+def cookbook(paths, output, jobs, title, fast_lexer):
+    """Compiles every program in PATHS into a single PDF with a table of contents."""
+    from src.cookbook import compile_cookbook
+
+    recipes = compile_cookbook(paths, output, jobs, title, fast_lexer)
+    if not recipes:
+        raise click.ClickException("No CUADRO programs were found")
+
+    failed = [recipe for recipe in recipes if not recipe.ok]
+    for recipe in failed:
+        print(f"ERROR {recipe.source}: {recipe.error}")
+    if failed:
+        print(f"\n{len(failed)} of {len(recipes)} recipes failed, the cookbook was not written")
+        raise SystemExit(1)
+    print(f"Cookbook with {len(recipes)} recipes written to {output}")
+
+
+@cli.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("-o", "--output-dir", default="out", type=click.Path(file_okay=False), show_default=True)
+@click.option("--interval", default=0.2, show_default=True, help="Seconds between checks for changes.")
+def watch(directory, output_dir, interval):
+    """Recompiles the programs in DIRECTORY every time they are saved."""
+    from src.watch import watch as watch_directory
+
+    try:
+        watch_directory(directory, output_dir, interval)
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--socket", "unix_socket", type=click.Path(dir_okay=False), help="Listen on a Unix socket instead.")
+@click.option("-j", "--workers", type=int, default=None, help="Worker processes. Defaults to the number of CPUs.")
+@click.option("--cache-dir", envvar="CUADROPY_CACHE_DIR", type=click.Path(file_okay=False),
+              help="Reuse compilations of unchanged programs stored in this directory.")
+def serve(host, port, unix_socket, workers, cache_dir):
+    """Runs a local compile server with warm compilers."""
+    from src.server import serve as run_server
+
+    try:
+        run_server(host, port, unix_socket, workers, cache_dir)
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.argument("filename", type=click.Path(exists=True))
+@click.option("-o", "--output", default="out.pdf", type=click.Path(dir_okay=False), show_default=True)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--socket", "unix_socket", type=click.Path(dir_okay=False), help="Connect to a Unix socket instead.")
+def client(filename, output, host, port, unix_socket):
+    """Compiles FILENAME on a running compile server."""
+    from src.client import request_compile
+
+    with open(filename, "r") as f:
+        source = f.read()
+    try:
+        ok, payload = request_compile(source, host, port, unix_socket)
+    except OSError as e:
+        raise click.ClickException(f"Unable to reach the compile server: {e}")
+
+    if not ok:
+        click.echo(payload.decode("utf-8"), err=True, nl=False)
+        raise SystemExit(1)
+    with open(output, "wb") as f:
+        f.write(payload)
+    print(f"Output has been generated: {output}")
+
+
+@cli.group()
+def index():
+    """Index of the ingredients, cooking steps and titles of a corpus of programs."""
+
+
+@index.command("build")
+@click.argument("paths", nargs=-1, required=True)
+@click.option("-i", "--index", "index_file", envvar="CUADROPY_INDEX", default="recipes.idx",
+              type=click.Path(dir_okay=False), show_default=True)
+@click.option("--fast-lexer", is_flag=True, help="Use the specialized lexer instead of the sly one.")
+def index_build(paths, index_file, fast_lexer):
+    """Indexes every program in PATHS (files, directories or globs), parsing only the changed ones."""
+    from src.index import RecipeIndex
+
+    with RecipeIndex(index_file, fast_lexer) as recipe_index:
+        stats = recipe_index.update(paths)
+    for path, error in stats.errors:
+        print(f"ERROR {path}: {error}")
+    print(f"{stats.parsed} parsed, {stats.unchanged} unchanged, {stats.removed} removed")
+    if stats.parsed + stats.unchanged == 0:
+        raise click.ClickException("No CUADRO programs were found")
+
+
+@index.command("query")
+@click.option("-i", "--index", "index_file", envvar="CUADROPY_INDEX", default="recipes.idx",
+              type=click.Path(dir_okay=False, exists=True), show_default=True)
+@click.option("--ingredient", "ingredients", multiple=True, help="Recipes declaring this ingredient.")
+@click.option("--step", "steps", multiple=True, help="Recipes calling this cooking step.")
+@click.option("--title", help="Recipes whose title contains this text, ignoring case.")
+def index_query(index_file, ingredients, steps, title):
+    """Lists the indexed recipes matching every given condition."""
+    from src.index import RecipeIndex
+
+    with RecipeIndex(index_file) as recipe_index:
+        try:
+            matches = recipe_index.query(ingredients, steps, title)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+    for path, recipe_title in matches:
+        print(f"{path}\t{recipe_title or ''}")
+
 
 if __name__ == "__main__":
-    run()
+    cli()
@@ -1,8 +1,5 @@
-from typing import Tuple
-
-from fpdf import FPDF
-
-from src.parser import CuadroParser
+from src.backends import BACKENDS, OutputBackend
+from src.parser.nodes import Node, NodeKind
 from src.semantic_analyzer import SemanticAnalyzer, CookingStep, Ingredient
 
 
@@ -11,73 +8,83 @@ def friendly_name(name: str):
 
 
 class OutputGenerator:
-    def __init__(self, filename, semantic_analyzer: SemanticAnalyzer):
+    """Outputs a program through one of the backends in `src.backends`.
+
+    The OutputGenerator decides what the recipe shows and numbers the
+    cooking steps. The backend for `output_format`, or the `backend`
+    given, decides how it looks. With `stream` the backend writes to `filename` as it goes, like PDF
+    pages written once finished, instead of keeping the whole document
+    in memory until `save`.
+    """
+
+    def __init__(
+        self,
+        filename,
+        semantic_analyzer: SemanticAnalyzer,
+        stream: bool = False,
+        output_format="pdf",
+        backend: OutputBackend = None,
+    ):
         self.filename = filename
-        self.pdf = FPDF()
-        self.pdf.set_font("Arial", size=12)
+        self.backend: OutputBackend = backend or BACKENDS[output_format](filename, stream)
         self._semantic_analyzer = semantic_analyzer
         self._step_ctr = 1
-
-    def _add_title(self, title):
-        self.pdf.add_page()
-        self.pdf.set_font("Arial", size=16, style="B")
-        self.pdf.cell(0, 10, title, ln=1, align="C")
-
-    def _add_subtitle(self, subtitle):
-        self.pdf.set_font("Arial", size=14, style="B")
-        self.pdf.cell(0, 10, subtitle, ln=1, align="C")
-
-    def _add_text(self, text):
-        self.pdf.write(10, text)
-
-    def _add_newline(self):
-        self.pdf.ln()
+        # AST nodes are output by kind. Kinds missing here, like the
+        # cooking step declarations, are output through their CookingStep
+        self._outputs = {
+            NodeKind.TITLE_HEADER: self._out_recipe_title,
+            NodeKind.INGREDIENTS_HEADER: self._out_recipe_subtitle,
+            NodeKind.RECIPE_HEADER: self._out_recipe_subtitle,
+            NodeKind.INGREDIENT_DECLARATION: self._out_ingredient_declaration,
+        }
 
     def save(self):
-        self.pdf.output(self.filename)
-
-    def _out_depth(self, d):
-        for i in range(d * 8):
-            self._add_text("\t")
+        self.backend.save()
 
     def _out_recipe_title(self, ast):
-        self._add_title(ast[1])
+        self.backend.title(ast.text)
 
     def _out_recipe_subtitle(self, ast):
-        self._add_subtitle(ast[1])
+        self.backend.subtitle(ast.text)
 
     def _out_ingredient_declaration(self, ast):
-        # self._add_text(f"Ingrediente -> {ast[1]}, {ast[2][1]}{ast[2][2]}")
-        f_name = friendly_name(ast[1])
-        self._add_text(f"{f_name}, {ast[2][1]}{ast[2][2]}")
-        self._add_newline()
-
-    def _out_cooking_step(self, step: CookingStep, depth=0):
-        self._out_depth(depth)
-        step_prefix = self._step_ctr if depth == 0 else f"{self._step_ctr}.{depth}"
-        self._add_text(f"Paso {step_prefix}. {friendly_name(step.lexical_name())}")
-        self._add_newline()
-        for ing in step.ingredients:
-            if isinstance(ing, Ingredient):
-                self._out_depth(depth + 1)
-                self._add_text(friendly_name(ing.name))
-                self._add_newline()
-            elif isinstance(ing, CookingStep):
-                self._out_cooking_step(ing, depth + 1)
-
-    def generate(self, code: [Tuple, CookingStep]):
+        f_name = friendly_name(ast.name)
+        self.backend.ingredient(f_name, f"{ast.quantity.value}{ast.quantity.unit}")
+
+    def _out_cooking_step(self, step: CookingStep):
+        # Nested steps are written with an explicit stack of the
+        # ingredients left at each depth, so any depth can be written
+        stack = []
+        while True:
+            depth = len(stack)
+            step_prefix = str(self._step_ctr) if depth == 0 else f"{self._step_ctr}.{depth}"
+            self.backend.step(step_prefix, friendly_name(step.lexical_name()), depth)
+            stack.append(iter(step.ingredients))
+            step = None
+            while stack and step is None:
+                for ing in stack[-1]:
+                    if isinstance(ing, Ingredient):
+                        self.backend.step_ingredient(friendly_name(ing.name), len(stack))
+                    elif isinstance(ing, CookingStep):
+                        step = ing
+                        break
+                else:
+                    stack.pop()
+            if step is None:
+                return
+
+    def generate(self, code: [Node, CookingStep]):
         if isinstance(code, CookingStep):
             self._out_cooking_step(code)
             self._step_ctr += 1
-        elif code[0] == CuadroParser.AST_NODE_INGREDIENT_DECLARATION:
-            self._out_ingredient_declaration(code)
-        elif code[0] == CuadroParser.AST_NODE_TITLE_HEADER:
-            self._out_recipe_title(code)
-        elif (
-            code[0] == CuadroParser.AST_NODE_INGREDIENTS_HEADER
-            or code[0] == CuadroParser.AST_NODE_RECIPE_HEADER
-        ):
-            self._out_recipe_subtitle(code)
+            return
+
+        out = self._outputs.get(code.kind)
+        if out is not None:
+            out(code)
 
     def write(self):
-        self.pdf.output(self.filename)
+        self.backend.save()
+
+    def to_bytes(self) -> bytes:
+        return self.backend.to_bytes()
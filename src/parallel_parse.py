@@ -0,0 +1,87 @@
+"""
+    Parallel parsing of huge CUADRO programs.
+
+    Every CUADRO instruction ends its own logical line, so a big program
+    can be split into chunks of whole lines, lexed and parsed on a pool
+    of worker processes and merged back in order. Each chunk is lexed
+    from its first line number, so diagnostics keep the line numbers
+    of the whole file.
+"""
+import contextlib
+import io
+import sys
+from typing import List, Optional, Tuple
+
+from src.frontend import ends_instruction
+
+
+def _parse_chunk(chunk: Tuple[int, str]) -> Tuple[List, str]:
+    """Parses the chunk, returning its ASTs and what the lexer printed on
+    stdout, to be shown in order by the caller.
+    """
+    # src.compiler imports this module
+    from src.compiler import worker_compiler
+
+    compiler = worker_compiler()
+    lineno, text = chunk
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        tokens = list(compiler.lxr.tokenize(text, lineno=lineno))
+        asts = compiler.parser.parse(iter(tokens)) if tokens else []
+    return asts, out.getvalue()
+
+
+def _instruction_end(text: str, pos: int) -> Optional[int]:
+    """The start of the first line after `pos` that follows a complete
+    instruction.
+    """
+    line_start = text.rfind("\n", 0, pos) + 1
+    while True:
+        newline = text.find("\n", line_start)
+        if newline == -1:
+            return None
+        if newline >= pos and ends_instruction(text[line_start:newline]):
+            return newline + 1
+        line_start = newline + 1
+
+
+def split_chunks(text: str, chunks: int) -> List[Tuple[int, str]]:
+    """Splits the program in up to `chunks` (first line number, text) pieces
+    of about the same size, only between instructions.
+    """
+    size = len(text) // chunks
+    result = []
+    start = 0
+    lineno = 1
+    while len(result) < chunks - 1:
+        cut = _instruction_end(text, start + size)
+        if cut is None or cut >= len(text):
+            break
+        result.append((lineno, text[start:cut]))
+        lineno += text.count("\n", start, cut)
+        start = cut
+    result.append((lineno, text[start:]))
+    return result
+
+
+def parse_parallel(frontend, text: str, jobs: int, fast_lexer: bool = False) -> List:
+    """Parses `text` in chunks on `jobs` worker processes.
+
+    If any chunk has a syntax error, the whole program is parsed again by
+    `frontend` on the serial path, so the error raised and what the lexer
+    printed before it are the same as without chunks.
+    """
+    from src.compiler import warm_pool
+
+    chunks = split_chunks(text, jobs * 2)
+    try:
+        with warm_pool(jobs, fast_lexer=fast_lexer) as executor:
+            results = list(executor.map(_parse_chunk, chunks))
+    except SyntaxError:
+        return frontend.parse_tokens(frontend.lxr.tokenize(text))
+
+    asts = []
+    for chunk_asts, out in results:
+        sys.stdout.write(out)
+        asts.extend(chunk_asts)
+    return asts
@@ -1 +1,2 @@
 from .parser import CuadroParser
+from .nodes import NodeKind
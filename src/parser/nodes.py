@@ -0,0 +1,268 @@
+"""
+    Compact AST nodes emitted by the CuadroParser.
+
+    Nodes are `__slots__` classes tagged with a small-int NodeKind, so
+    consumers can dispatch through tables indexed by kind instead of
+    comparing strings. `to_tuple` gives the historical tuple form,
+    which is also how nodes are printed.
+
+    Nodes are never changed once built, so the parser hash-conses them
+    through a NodeTable: structurally equal identifiers, strings,
+    quantities and function calls of a program are a single node.
+    Function calls found more than once are flagged as `shared`, so
+    what is worked out of them can be reused.
+"""
+from enum import IntEnum
+from typing import Dict, Iterable, Iterator, Tuple
+
+
+class NodeKind(IntEnum):
+    TITLE_HEADER = 0
+    INGREDIENTS_HEADER = 1
+    RECIPE_HEADER = 2
+    INGREDIENT_DECLARATION = 3
+    FUNCTION_BASED_DECLARATION = 4
+    FUNCTION_CALL = 5
+    IDENTIFIER = 6
+    STRING = 7
+    QUANTITY = 8
+
+
+# Name of each kind in the tuple form of the AST, indexed by kind
+KIND_NAMES = (
+    "title-header",
+    "ingredients-header",
+    "recipe-header",
+    "ingredient-declaration",
+    "variable-declaration",
+    "function-call",
+    "identifier",
+    "string",
+    "quantity",
+)
+
+
+class Node:
+    """Base of the AST nodes.
+
+    The tuple form of a node is its kind name, its `_fields` and the tuple
+    form of its children, in a list when `_list_children` is set. Nodes are
+    compared, converted and printed with an explicit stack, so any depth of
+    nested calls works.
+    """
+
+    __slots__ = ()
+
+    kind: NodeKind
+    _fields: Tuple[str, ...] = ()
+    _list_children = False
+
+    def _label(self) -> Tuple:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def children(self) -> Iterable["Node"]:
+        return ()
+
+    def to_tuple(self) -> Tuple:
+        built = []  # Tuples of the nodes finished and not yet given to their parent
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            children = node.children()
+            if children and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+
+            first = len(built) - len(children)
+            children_tuples = built[first:]
+            del built[first:]
+            tail = (children_tuples,) if node._list_children else tuple(children_tuples)
+            built.append((KIND_NAMES[node.kind],) + node._label() + tail)
+        return built[0]
+
+    def __eq__(self, other):
+        if not isinstance(other, Node):
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a is b:
+                continue
+            if a.kind != b.kind or a._label() != b._label():
+                return False
+            a_children, b_children = a.children(), b.children()
+            if len(a_children) != len(b_children):
+                return False
+            stack.extend(zip(a_children, b_children))
+        return True
+
+    __hash__ = None
+
+    def __repr__(self):
+        # The same as repr(self.to_tuple()), which recurses once per level
+        parts = []
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+
+            head = "(" + ", ".join(map(repr, (KIND_NAMES[item.kind],) + item._label()))
+            children = item.children()
+            if not children and not item._list_children:
+                parts.append(head + ")")
+                continue
+            parts.append(head + (", [" if item._list_children else ", "))
+            stack.append("])" if item._list_children else ")")
+            for i, child in enumerate(reversed(children)):
+                if i:
+                    stack.append(", ")
+                stack.append(child)
+        return "".join(parts)
+
+
+class Header(Node):
+    __slots__ = ("kind", "text")
+    _fields = ("text",)
+
+    def __init__(self, kind: NodeKind, text: str):
+        self.kind = kind
+        self.text = text
+
+
+class Quantity(Node):
+    __slots__ = ("value", "unit")
+    kind = NodeKind.QUANTITY
+    _fields = ("value", "unit")
+
+    def __init__(self, value, unit: str):
+        self.value = value
+        self.unit = unit
+
+
+class Identifier(Node):
+    __slots__ = ("name",)
+    kind = NodeKind.IDENTIFIER
+    _fields = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class StringLiteral(Node):
+    __slots__ = ("value",)
+    kind = NodeKind.STRING
+    _fields = ("value",)
+
+    def __init__(self, value: str):
+        self.value = value
+
+
+class FunctionCall(Node):
+    """`shared` is set by the NodeTable once the call is found again in the program."""
+
+    __slots__ = ("name", "args", "shared")
+    kind = NodeKind.FUNCTION_CALL
+    _fields = ("name",)
+    _list_children = True
+
+    def __init__(self, name: str, args: Tuple[Node, ...]):
+        self.name = name
+        self.args = args
+        self.shared = False
+
+    def children(self):
+        return self.args
+
+
+class IngredientDeclaration(Node):
+    __slots__ = ("name", "quantity")
+    kind = NodeKind.INGREDIENT_DECLARATION
+    _fields = ("name",)
+
+    def __init__(self, name: str, quantity: Quantity):
+        self.name = name
+        self.quantity = quantity
+
+    def children(self):
+        return (self.quantity,)
+
+
+class StepDeclaration(Node):
+    """A variable declared from a cooking step, like `mezcla = mezclar(a, b);`"""
+
+    __slots__ = ("name", "call")
+    kind = NodeKind.FUNCTION_BASED_DECLARATION
+    _fields = ("name",)
+
+    def __init__(self, name: str, call: FunctionCall):
+        self.name = name
+        self.call = call
+
+    def children(self):
+        return (self.call,)
+
+
+class NodeTable:
+    """Builds nodes, returning the same node for structurally equal ones.
+
+    A call is keyed by its name and the identity of its arguments, which
+    are already unique when built through the same table, so equal
+    subtrees of any depth are found with a single lookup. The table keeps
+    every node it built alive, so it lives as long as a single parse.
+    With `share` False every node is a new one.
+    """
+
+    __slots__ = ("_nodes", "share")
+
+    def __init__(self, share: bool = True):
+        self._nodes: Dict[tuple, Node] = {}
+        self.share = share
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _get(self, key: tuple) -> Node:
+        return self._nodes.get(key) if self.share else None
+
+    def _put(self, key: tuple, node: Node) -> Node:
+        if self.share:
+            self._nodes[key] = node
+        return node
+
+    # Keys start with the class of the node, which hashes faster than its kind
+
+    def identifier(self, name: str) -> Identifier:
+        key = (Identifier, name)
+        return self._get(key) or self._put(key, Identifier(name))
+
+    def string(self, value: str) -> StringLiteral:
+        key = (StringLiteral, value)
+        return self._get(key) or self._put(key, StringLiteral(value))
+
+    def quantity(self, value, unit: str) -> Quantity:
+        # 1 and 1.0 are equal keys, but print differently
+        key = (Quantity, type(value), value, unit)
+        return self._get(key) or self._put(key, Quantity(value, unit))
+
+    def call(self, name: str, args: Tuple[Node, ...]) -> FunctionCall:
+        key = (FunctionCall, name, tuple(map(id, args)))
+        node = self._get(key)
+        if node is None:
+            return self._put(key, FunctionCall(name, args))
+        node.shared = True
+        return node
+
+
+def iter_nodes(asts: Iterable[Node]) -> Iterator[Node]:
+    """Every node of the given ASTs, nested ones included, in depth first order.
+
+    A shared node is yielded every time it's reached, as if it was a copy.
+    """
+    stack = list(reversed(list(asts)))
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children()))
@@ -2,11 +2,21 @@
     This file contains the Lexer for ClangUchiha's CUADRO
     implementation
 """
+import sys
+
 from sly import Parser
 from src.lexer import CuadroLex
+from .nodes import (
+    NodeKind,
+    NodeTable,
+    Header,
+    IngredientDeclaration,
+    StepDeclaration,
+)
+from .tables import CachedParserMeta
 
 
-class CuadroParser(Parser):
+class CuadroParser(Parser, metaclass=CachedParserMeta):
     """The Parser definition for our CUADRO implementation
 
     The Grammar is declared using the SLY library specification:
@@ -17,10 +27,26 @@ class CuadroParser(Parser):
     is the function `expr`.
 
     A `expr` can be any of the valid CUADRO instructions.
+
+    The AST is made of the compact nodes in `nodes.py`. The AST_* names
+    below are the names of each node kind in the tuple form of the AST.
+    Identifiers are interned, so repeated names share one string, and
+    the leaves and function calls are hash-consed by a NodeTable, so
+    equal subtrees of a program are a single node. Set `hash_cons` to
+    False to build every node on its own.
+
+    The LALR tables built by sly are persisted by CachedParserMeta,
+    so they are only built again when the grammar changes.
     """
 
     tokens = CuadroLex.tokens
 
+    # We don't use sly's position tracking, and it keeps a record of every
+    # reduced value for the lifetime of the parser instance.
+    track_positions = False
+
+    hash_cons = True
+
     # AST node types
 
     AST_PROGRAM = "cuadro"
@@ -47,6 +73,22 @@ class CuadroParser(Parser):
 
     AST_IDENTIFIER = "identifier"
 
+    def parse(self, tokens):
+        # Nodes are only shared within a program, so the table can't grow
+        # for the lifetime of the parser
+        self.nodes = NodeTable(self.hash_cons)
+        try:
+            return super().parse(tokens)
+        finally:
+            self.nodes = None
+
+    def error(self, token):
+        # sly recovers by dropping what was parsed so far, which would
+        # accept the rest of a wrong program
+        if token is None:
+            raise SyntaxError("Syntax error: unexpected end of the program")
+        raise SyntaxError(f"Syntax error at line {token.lineno}: unexpected {token.type} {token.value!r}")
+
     # cuadro : expressions
 
     @_("expressions")
@@ -63,7 +105,9 @@ class CuadroParser(Parser):
 
     @_("expressions expr")
     def expressions(self, p):
-        return (self.AST_EXPRESSIONS, p.expressions[1] + [p.expr])
+        # Appending in place keeps building the program linear
+        p.expressions[1].append(p.expr)
+        return p.expressions
 
     # top level expresions that CUADRO supports
     # expr : HEADER
@@ -73,11 +117,11 @@ class CuadroParser(Parser):
     @_("HEADER")
     def expr(self, p):
         if p.HEADER.count("#") == 2:
-            return (self.AST_NODE_TITLE_HEADER, p.HEADER.replace("#", ""))
+            return Header(NodeKind.TITLE_HEADER, p.HEADER.replace("#", ""))
         elif p.HEADER.count("#") == 4:
-            return (self.AST_NODE_INGREDIENTS_HEADER, p.HEADER.replace("#", ""))
+            return Header(NodeKind.INGREDIENTS_HEADER, p.HEADER.replace("#", ""))
         elif p.HEADER.count("#") == 6:
-            return (self.AST_NODE_RECIPE_HEADER, p.HEADER.replace("#", ""))
+            return Header(NodeKind.RECIPE_HEADER, p.HEADER.replace("#", ""))
 
     @_("declaration END_LINE", "funct_call END_LINE")
     def expr(self, p):
@@ -88,25 +132,17 @@ class CuadroParser(Parser):
 
     @_("IDENTIFIER ASSIGN quantity")
     def declaration(self, p):
-        return (
-            self.AST_NODE_INGREDIENT_DECLARATION,
-            p.IDENTIFIER,
-            p.quantity,
-        )
+        return IngredientDeclaration(sys.intern(p.IDENTIFIER), p.quantity)
 
     @_("IDENTIFIER ASSIGN funct_call")
     def declaration(self, p):
-        return (
-            self.AST_NODE_FUNCTION_BASED_DECLARATION,
-            p.IDENTIFIER,
-            p.funct_call,
-        )
+        return StepDeclaration(sys.intern(p.IDENTIFIER), p.funct_call)
 
     # funct_call : IDENTIFIER arglist
 
     @_("IDENTIFIER arglist")
     def funct_call(self, p):
-        return (self.AST_FUNCTION_CALL, p.IDENTIFIER, p.arglist[1])
+        return self.nodes.call(sys.intern(p.IDENTIFIER), tuple(p.arglist[1]))
 
     # arglist : OPEN_PARENT args CLOSE_PARENT
 
@@ -114,22 +150,33 @@ class CuadroParser(Parser):
     def arglist(self, p):
         return (self.AST_ARGLIST, p.args[1])
 
-    # args : argument
-    #      | argument COMMA args
+    # args : arguments
+    #      | arguments COMMA
     #      | empty
 
-    @_("argument")
+    @_("arguments", "arguments COMMA")
     def args(self, p):
-        return (self.AST_ARGS, [p.argument[1]])
-
-    @_("argument COMMA args")
-    def args(self, p):
-        return (self.AST_ARGS, [p.argument[1]] + p.args[1])
+        return (self.AST_ARGS, p.arguments)
 
     @_("empty")
     def args(self, p):
         return (self.AST_ARGS, [])
 
+    # arguments : argument
+    #           | arguments COMMA argument
+    #
+    # Left recursive, so each argument is appended to the list
+    # built so far instead of copying it on every reduction.
+
+    @_("argument")
+    def arguments(self, p):
+        return [p.argument[1]]
+
+    @_("arguments COMMA argument")
+    def arguments(self, p):
+        p.arguments.append(p.argument[1])
+        return p.arguments
+
     # argument : funct_call
     #          | identifier
     #          | string
@@ -143,13 +190,13 @@ class CuadroParser(Parser):
 
     @_("STRING")
     def string(self, p):
-        return (self.AST_STRING, p.STRING)
+        return self.nodes.string(p.STRING)
 
     # quantity : number unit
 
     @_("number unit")
     def quantity(self, p):
-        return (self.AST_QUANTITY, p.number[1], p.unit[1])
+        return self.nodes.quantity(p.number[1], p.unit[1])
 
     # number : FLOAT
     #        | INTEGER
@@ -175,7 +222,7 @@ class CuadroParser(Parser):
 
     @_("IDENTIFIER")
     def identifier(self, p):
-        return (self.AST_IDENTIFIER, p.IDENTIFIER)
+        return self.nodes.identifier(sys.intern(p.IDENTIFIER))
 
     # empty : epsilon
 
@@ -0,0 +1,122 @@
+"""
+    Persistence of the LALR tables sly builds for a Parser.
+
+    sly builds the grammar and its parsing tables every time the Parser
+    class is created, which is on every run of the compiler. The
+    CachedParserMeta metaclass stores the tables the first time and
+    loads them afterwards, as long as the grammar didn't change.
+
+    Only modules that are cheap to import are used here (marshal, zlib),
+    otherwise importing them would cost as much as building the tables.
+"""
+import marshal
+import os
+import zlib
+from types import SimpleNamespace
+
+import sly
+from sly.yacc import ParserMeta, Production
+
+TABLES_DIR = os.path.join(os.path.dirname(__file__), "__pycache__")
+
+
+def _rule_functions(attributes):
+    """Yields ((attribute name, position in the overload chain), function)
+    for every grammar rule function, in definition order."""
+    for name, value in attributes.items():
+        depth = 0
+        func = value if callable(value) and hasattr(value, "rules") else None
+        while func:
+            yield (name, depth), func
+            func = getattr(func, "next_func", None)
+            depth += 1
+
+
+def _grammar_signature(clsname, attributes) -> str:
+    spec = repr(
+        (
+            sly.__version__,
+            clsname,
+            sorted(attributes.get("tokens", ())),
+            attributes.get("start"),
+            attributes.get("precedence"),
+            [(key, func.rules) for key, func in _rule_functions(attributes)],
+        )
+    ).encode()
+    return f"{zlib.crc32(spec):08x}{len(spec):x}"
+
+
+def _tables_path(clsname, signature):
+    return os.path.join(TABLES_DIR, f"{clsname.lower()}.parsetab.{signature}.marshal")
+
+
+def _remove_stale(path, clsname):
+    """Removes the tables of older grammars of `clsname`, all but `path`."""
+    prefix = f"{clsname.lower()}.parsetab."
+    for name in os.listdir(TABLES_DIR):
+        stale = os.path.join(TABLES_DIR, name)
+        if name.startswith(prefix) and name.endswith(".marshal") and stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass  # Removed by another process, or not ours to remove
+
+
+def _save(path, cls, attributes):
+    keys = {id(func): key for key, func in _rule_functions(attributes)}
+    tables = {
+        "productions": [
+            (p.name, p.prod, keys.get(id(p.func))) for p in cls._grammar.Productions
+        ],
+        "lr_action": cls._lrtable.lr_action,
+        "lr_goto": cls._lrtable.lr_goto,
+        "defaulted_states": cls._lrtable.defaulted_states,
+    }
+    try:
+        os.makedirs(TABLES_DIR, exist_ok=True)
+        # Written aside and renamed, so other processes never read a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump(tables, f)
+        os.replace(tmp, path)
+        _remove_stale(path, cls.__name__)
+    except OSError:
+        pass  # A read-only install just keeps building the tables
+
+
+def _load(path, cls, attributes) -> bool:
+    try:
+        with open(path, "rb") as f:
+            tables = marshal.load(f)
+    except (OSError, ValueError, EOFError, TypeError):
+        return False
+
+    funcs = dict(_rule_functions(attributes))
+    productions = [
+        Production(number, name, prod, func=funcs.get(key) if key else None)
+        for number, (name, prod, key) in enumerate(tables["productions"])
+    ]
+    # Only what Parser.parse reads from the grammar and the tables
+    cls._grammar = SimpleNamespace(Productions=productions)
+    cls._lrtable = SimpleNamespace(
+        lr_action=tables["lr_action"],
+        lr_goto=tables["lr_goto"],
+        defaulted_states=tables["defaulted_states"],
+    )
+    return True
+
+
+class CachedParserMeta(ParserMeta):
+    def __new__(meta, clsname, bases, attributes):
+        path = _tables_path(clsname, _grammar_signature(clsname, attributes))
+
+        if os.path.exists(path):
+            cls_attributes = dict(attributes)
+            del cls_attributes["_"]
+            cls = type.__new__(meta, clsname, bases, cls_attributes)
+            if _load(path, cls, attributes):
+                return cls
+
+        cls = super().__new__(meta, clsname, bases, attributes)
+        _save(path, cls, attributes)
+        return cls
@@ -0,0 +1,162 @@
+"""
+    FPDF documents with extra needs.
+
+    FPDF builds the whole document in memory, and only serializes it on
+    `output`. StreamingFPDF writes every page to the output file as soon as
+    the next one starts, so only the page being laid out is in memory.
+    CookbookFPDF numbers its pages and can go back to fill in earlier ones.
+"""
+import os
+import zlib
+from contextlib import contextmanager
+
+from fpdf import FPDF
+
+
+class _FileBuffer:
+    """Stands for `FPDF.buffer`, writing to a file instead of a string.
+
+    FPDF appends to its buffer with `+=` and takes the object offsets
+    for the cross-reference table from `len(buffer)`.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._size = 0
+
+    def __iadd__(self, s: str):
+        # FPDF keeps the document as a latin-1 string
+        data = s.encode("latin1")
+        self._f.write(data)
+        self._size += len(data)
+        return self
+
+    def __len__(self):
+        return self._size
+
+
+class StreamingFPDF(FPDF):
+    """An FPDF that writes the document to `filename` while it's generated.
+
+    The document is the same FPDF would output: FPDF already writes all
+    the pages first, and the fonts, catalog and cross-reference table
+    after them. Pages can't be changed once finished, so links and the
+    alias for the total number of pages are not supported.
+    """
+
+    def __init__(self, filename, orientation="P", unit="mm", format="A4"):
+        super().__init__(orientation, unit, format)
+        self.filename = filename
+        self._file = open(filename, "wb")
+        self.buffer = _FileBuffer(self._file)
+
+    def alias_nb_pages(self, alias="{nb}"):
+        raise RuntimeError("The total number of pages is unknown while the document is streamed")
+
+    def link(self, x, y, w, h, link):
+        raise RuntimeError("Links are not supported while the document is streamed")
+
+    def _endpage(self):
+        super()._endpage()
+        if self.page == 1:
+            self._putheader()
+        self._putpage(self.page)
+
+    def _putpage(self, n):
+        """Writes page `n` and frees its contents, like FPDF._putpages does for every page."""
+        if self.def_orientation == "P":
+            w_pt, h_pt = self.fw_pt, self.fh_pt
+        else:
+            w_pt, h_pt = self.fh_pt, self.fw_pt
+
+        self._newobj()
+        self._out("<</Type /Page")
+        self._out("/Parent 1 0 R")
+        if n in self.orientation_changes:
+            self._out("/MediaBox [0 0 %.2f %.2f]" % (h_pt, w_pt))
+        self._out("/Resources 2 0 R")
+        if self.pdf_version > "1.3":
+            self._out("/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>")
+        self._out("/Contents " + str(self.n + 1) + " 0 R>>")
+        self._out("endobj")
+
+        if self.compress:
+            content = zlib.compress(self.pages[n].encode("latin1"))
+            filter = "/Filter /FlateDecode "
+        else:
+            content = self.pages[n]
+            filter = ""
+        self.pages[n] = ""
+        self._newobj()
+        self._out("<<" + filter + "/Length " + str(len(content)) + ">>")
+        self._putstream(content)
+        self._out("endobj")
+
+    def _putpages(self):
+        # The pages are already written, only their root is left
+        if self.def_orientation == "P":
+            w_pt, h_pt = self.fw_pt, self.fh_pt
+        else:
+            w_pt, h_pt = self.fh_pt, self.fw_pt
+        nb = self.page
+
+        self.offsets[1] = len(self.buffer)
+        self._out("1 0 obj")
+        self._out("<</Type /Pages")
+        self._out("/Kids [" + "".join(str(3 + 2 * i) + " 0 R " for i in range(nb)) + "]")
+        self._out("/Count " + str(nb))
+        self._out("/MediaBox [0 0 %.2f %.2f]" % (w_pt, h_pt))
+        self._out(">>")
+        self._out("endobj")
+
+    def _putheader(self):
+        # Written before the first page instead of when the document ends
+        if len(self.buffer) == 0:
+            super()._putheader()
+
+    def output(self, name="", dest=""):
+        """Finishes the document and closes the file. Nothing is returned."""
+        if self.state < 3:
+            self.close()
+        if not self._file.closed:
+            self._file.close()
+        return ""
+
+    def discard(self):
+        """Closes and removes the unfinished document."""
+        self._file.close()
+        os.remove(self.filename)
+
+
+class CookbookFPDF(FPDF):
+    """An FPDF for documents with many recipes, like a cookbook.
+
+    Every page gets its number in the footer, and pages already finished
+    can be drawn on again with `on_page`, to fill in a table of contents
+    once the pages of every recipe are known.
+    """
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Arial", style="I", size=8)
+        self.cell(0, 10, str(self.page_no()), align="C")
+
+    @contextmanager
+    def on_page(self, n):
+        """Draws on page `n` from its top, then goes back to where it was."""
+        saved = (
+            self.page, self.x, self.y, self.auto_page_break,
+            self.font_family, self.font_style, self.font_size_pt, self.font_size, self.current_font,
+        )
+        self.page = n
+        self.x, self.y = self.l_margin, self.t_margin
+        self.auto_page_break = 0
+        # Every page has its own content, which must select its own font
+        self.font_family = ""
+        try:
+            yield
+        finally:
+            (
+                self.page, self.x, self.y, self.auto_page_break,
+                self.font_family, self.font_style, self.font_size_pt, self.font_size, self.current_font,
+            ) = saved
@@ -0,0 +1,99 @@
+"""
+    Instrumentation of the compile pipeline: wall time per phase
+    and counters such as the number of tokens or AST nodes.
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List
+
+from src.parser.nodes import iter_nodes
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def count_ast_nodes(asts: List) -> int:
+    """Counts every node in the given ASTs, nested ones included."""
+    return sum(1 for _ in iter_nodes(asts))
+
+
+def peak_memory() -> int:
+    """Peak resident set size of the process, in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class NullProfiler:
+    """The profiler used when instrumentation is disabled. Does nothing."""
+
+    enabled = False
+
+    def phase(self, name):
+        return nullcontext()
+
+    def count(self, name, value):
+        pass
+
+
+class Profiler(NullProfiler):
+    """Records the wall time of each phase and the counters of a compilation.
+
+    Callbacks are called as `callback(event, name, value)` right when the
+    data is recorded, with `event` being "phase" (value in seconds)
+    or "counter".
+    """
+
+    enabled = True
+
+    def __init__(self, callbacks: List[Callable] = None):
+        self.callbacks = list(callbacks or [])
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def _notify(self, event, name, value):
+        for callback in self.callbacks:
+            callback(event, name, value)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            self._notify("phase", name, elapsed)
+
+    def count(self, name, value):
+        self.counters[name] = value
+        self._notify("counter", name, value)
+
+    def report(self) -> Dict:
+        return {
+            "phases": dict(self.phases),
+            "total": sum(self.phases.values()),
+            "counters": dict(self.counters),
+            "peak_memory": peak_memory(),
+        }
+
+    def format(self, fmt="text") -> str:
+        report = self.report()
+        if fmt == "json":
+            return json.dumps(report, indent=2)
+
+        lines = ["Phase                 Time (ms)"]
+        for name, elapsed in report["phases"].items():
+            lines.append(f"{name:<18} {elapsed * 1000:12.3f}")
+        lines.append(f"{'total':<18} {report['total'] * 1000:12.3f}")
+        lines.append("")
+        for name, value in report["counters"].items():
+            lines.append(f"{name:<18} {value:12}")
+        lines.append(f"{'peak memory (KiB)':<18} {report['peak_memory'] // 1024:12}")
+        return "\n".join(lines)
@@ -0,0 +1,115 @@
+"""
+    Columnar store of the ingredient quantities of many recipes.
+
+    The `ingredient-declaration` ASTs of every recipe are kept as NumPy
+    arrays, a row per declaration with its recipe, ingredient, value and
+    unit code, so scaling recipes or totaling their ingredients is a single
+    vectorized operation instead of a loop over Amount objects.
+
+    NumPy is an optional dependency, only needed by this module.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("src.quantities needs NumPy, install it with `pip install numpy`") from e
+
+from src.frontend import CuadroFrontend
+from src.lexer import CuadroLex
+from src.parser import CuadroParser, NodeKind
+from src.parser.nodes import Node
+from src.semantic_analyzer import Amount, CardinalUnits, Grams, Milliliters
+
+UNITS = ("gr", "ml", "cu")
+UNIT_CODES = {unit: code for code, unit in enumerate(UNITS)}
+
+_AMOUNTS = {"gr": Grams, "ml": Milliliters, "cu": CardinalUnits}
+
+
+class QuantityStore:
+    """The quantities declared by a set of recipes.
+
+    Row i declares `value[i]` of `UNITS[unit[i]]` of the ingredient
+    `ingredients[ingredient[i]]` in the recipe `recipes[recipe[i]]`.
+    Recipes and ingredients are numbered in the order they are first found.
+    """
+
+    def __init__(self, recipes: List[str], ingredients: List[str], recipe, ingredient, value, unit):
+        self.recipes = recipes
+        self.ingredients = ingredients
+        self.recipe: np.ndarray = recipe
+        self.ingredient: np.ndarray = ingredient
+        self.value: np.ndarray = value
+        self.unit: np.ndarray = unit
+
+    @classmethod
+    def from_asts(cls, programs: Iterable[Tuple[str, Iterable[Node]]]) -> "QuantityStore":
+        """The store of the (name, ASTs) of every recipe, only the ingredient declarations are read."""
+        recipes = []
+        ingredient_codes: Dict[str, int] = {}
+        recipe, ingredient, value, unit = [], [], [], []
+        for name, asts in programs:
+            code = len(recipes)
+            recipes.append(name)
+            for ast in asts:
+                if ast.kind != NodeKind.INGREDIENT_DECLARATION:
+                    continue
+                recipe.append(code)
+                ingredient.append(ingredient_codes.setdefault(ast.name, len(ingredient_codes)))
+                value.append(ast.quantity.value)
+                unit.append(UNIT_CODES[ast.quantity.unit])
+
+        return cls(
+            recipes,
+            list(ingredient_codes),
+            np.array(recipe, dtype=np.int32),
+            np.array(ingredient, dtype=np.int32),
+            np.array(value, dtype=np.float64),
+            np.array(unit, dtype=np.int8),
+        )
+
+    @classmethod
+    def from_files(cls, filenames: Iterable[str], lxr: CuadroLex = None, parser: CuadroParser = None):
+        """The store of the given programs, named by their filename."""
+        lxr = lxr or CuadroLex()
+        parser = parser or CuadroParser()
+        return cls.from_asts(
+            (filename, CuadroFrontend(filename, lxr, parser).parse_file()) for filename in filenames
+        )
+
+    def __len__(self):
+        return len(self.value)
+
+    def scale(self, factors) -> "QuantityStore":
+        """A store with every quantity of recipe r multiplied by `factors[r]`,
+        or by `factors` if it's a single number, like servings over the
+        servings of the recipe. Cardinal units aren't rounded."""
+        factors = np.asarray(factors, dtype=np.float64)
+        if factors.ndim == 0:
+            value = self.value * factors
+        elif factors.shape == (len(self.recipes),):
+            value = self.value * factors[self.recipe]
+        else:
+            raise ValueError(f"Expected a factor for each of the {len(self.recipes)} recipes, got {factors.shape}")
+        return QuantityStore(self.recipes, self.ingredients, self.recipe, self.ingredient, value, self.unit)
+
+    def totals(self) -> Dict[Tuple[str, str], float]:
+        """The total of every ingredient per unit, over all the recipes."""
+        keys = self.ingredient.astype(np.int64) * len(UNITS) + self.unit
+        keys, rows = np.unique(keys, return_inverse=True)
+        sums = np.bincount(rows, weights=self.value, minlength=len(keys))
+        return {
+            (self.ingredients[key // len(UNITS)], UNITS[key % len(UNITS)]): total
+            for key, total in zip(keys.tolist(), sums.tolist())
+        }
+
+    def amounts(self, recipe: int) -> List[Tuple[str, Amount]]:
+        """The ingredients of the recipe number `recipe`, with their Amount of a float value."""
+        rows = np.flatnonzero(self.recipe == recipe)
+        return [
+            (self.ingredients[ingredient], _AMOUNTS[UNITS[unit]](value))
+            for ingredient, value, unit in zip(
+                self.ingredient[rows].tolist(), self.value[rows].tolist(), self.unit[rows].tolist()
+            )
+        ]
@@ -1,5 +1,8 @@
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Mapping, Type
+from src.dataflow import IngredientFlow
 from src.parser import CuadroParser
+from src.parser.nodes import NodeKind, KIND_NAMES
+from src.steps import cooking_steps
 import abc
 
 
@@ -74,12 +77,22 @@ class CookingStep(abc.ABC):
 
     def do(self):
         # At this point somebody should have used `validate_ingredients`
-        # Children classes can implement additional logic on top of this one
-        for ing in self.ingredients:
-            if isinstance(ing, Ingredient):
-                self.ingredients_table[ing.name].use()
-            elif isinstance(ing, CookingStep):
-                ing.do()
+        # Children classes can implement additional logic on top of this one.
+        # Nested steps that don't are done here with an explicit stack, in
+        # the same order as calling their `do`, so any depth can be done
+        stack = [iter(self.ingredients)]
+        while stack:
+            for ing in stack[-1]:
+                if isinstance(ing, Ingredient):
+                    self.ingredients_table[ing.name].use()
+                elif isinstance(ing, CookingStep):
+                    if type(ing).do is not CookingStep.do:
+                        ing.do()
+                        continue
+                    stack.append(iter(ing.ingredients))
+                    break
+            else:
+                stack.pop()
 
 
 class Fillet(CookingStep):
@@ -126,18 +139,65 @@ class Mix(CookingStep):
         return "mezclar"
 
 
+class RecipeStructure:
+    """Checks the order of the sections of a recipe one instruction at a time.
+
+    A recipe is a title, the ingredients header, at least one ingredient,
+    the recipe header and at least one cooking step. `error` keeps the
+    first problem found, once `end` is called for the last instruction.
+    """
+
+    TITLE, INGREDIENTS_HEADER, INGREDIENTS, STEPS = range(4)
+
+    def __init__(self):
+        self.section = self.TITLE
+        self.ingredients = 0
+        self.steps = 0
+        self.error = None
+
+    def visit(self, kind: NodeKind):
+        if self.section == self.TITLE:
+            if kind != NodeKind.TITLE_HEADER:
+                self.error = "The recipe must start with a title first"
+            self.section = self.INGREDIENTS_HEADER
+        elif self.section == self.INGREDIENTS_HEADER:
+            if kind != NodeKind.INGREDIENTS_HEADER:
+                self.error = "The recipe must have ingredients second"
+            self.section = self.INGREDIENTS
+        elif self.section == self.INGREDIENTS:
+            if kind == NodeKind.RECIPE_HEADER:
+                if self.ingredients == 0:
+                    self.error = "The recipe must have at least one ingredient"
+                self.section = self.STEPS
+            elif kind != NodeKind.INGREDIENT_DECLARATION:
+                self.error = "The recipe ingredients list should be a list of ingredients"
+            else:
+                self.ingredients += 1
+        elif kind != NodeKind.FUNCTION_BASED_DECLARATION:
+            self.error = "The recipe must have a list of only cooking steps after the recipe header"
+        else:
+            self.steps += 1
+
+    def end(self):
+        if self.error:
+            return
+        if self.section < self.STEPS:
+            self.error = "The recipe must have a recipe section"
+        elif self.steps == 0:
+            self.error = "The recipe must have at least one cooking step"
+
+
 class SemanticAnalyzer:
-    def __init__(self, asts: List):
+    def __init__(self, asts: List, build_table: bool = True):
         self._INGREDIENTS: Dict[str, Ingredient] = {}
         self.asts = asts
-        self.process_ingredients(asts)
+        self.warnings: List[str] = []
+        # `analyze` builds the table on its own pass
+        if build_table:
+            self.process_ingredients(asts)
 
-        self._COOKING_STEPS: Dict[str, CookingStep] = {
-            Fillet.lexical_name(): Fillet,
-            Season.lexical_name(): Season,
-            Fry.lexical_name(): Fry,
-            Mix.lexical_name(): Mix,
-        }
+        # Step classes are only imported once a recipe uses them
+        self._COOKING_STEPS: Mapping[str, Type[CookingStep]] = cooking_steps()
 
     def _get_quantity(self, amount, unit):
         if unit == "gr":
@@ -156,9 +216,9 @@ class SemanticAnalyzer:
             table of identifiers.
         """
         for ast in asts:
-            if ast[0] == CuadroParser.AST_NODE_INGREDIENT_DECLARATION:
-                q = self._get_quantity(ast[2][1], ast[2][2])
-                ingredient = Ingredient(ast[1], q)
+            if ast.kind == NodeKind.INGREDIENT_DECLARATION:
+                q = self._get_quantity(ast.quantity.value, ast.quantity.unit)
+                ingredient = Ingredient(ast.name, q)
 
                 if ingredient.name in self._INGREDIENTS:
                     raise RuntimeError(
@@ -168,6 +228,15 @@ class SemanticAnalyzer:
 
                 self._INGREDIENTS[ingredient.name] = ingredient
 
+    def analyze_dataflow(self) -> IngredientFlow:
+        """Follows every ingredient from its declaration to the steps using it.
+
+        Unused ingredients are not an error, they are kept in `warnings`.
+        """
+        flow = IngredientFlow(self.asts)
+        self.warnings = flow.warnings()
+        return flow
+
     def validate_ast(self):
         # Validates the existence of a title, a title for ingredients and a title of cooking steps
         self.validate_titles()
@@ -180,28 +249,30 @@ class SemanticAnalyzer:
         titles = []
 
         for ast in self.asts:
-            if ast[0] in [
-                CuadroParser.AST_NODE_TITLE_HEADER,
-                CuadroParser.AST_NODE_INGREDIENTS_HEADER,
-                CuadroParser.AST_NODE_RECIPE_HEADER,
-            ]:
-                titles.append(ast[0])
-
-        if len(titles) != 3:
+            if ast.kind <= NodeKind.RECIPE_HEADER:
+                titles.append(ast.kind)
+
+        self._check_titles(titles)
+
+    _TITLES = (
+        (NodeKind.TITLE_HEADER, "The recipe must have a title first"),
+        (NodeKind.INGREDIENTS_HEADER, "The recipe must have ingredients second"),
+        (NodeKind.RECIPE_HEADER, "The recipe must have the recipe third"),
+    )
+
+    def _check_titles(self, titles: List[NodeKind], complete: bool = True):
+        """With `complete` False, `titles` can be the titles read so far."""
+        if len(titles) > 3 or complete and len(titles) != 3:
             raise RuntimeError("The recipe must have a main title, an ingredients title and recipe title")
-        if titles[0] != CuadroParser.AST_NODE_TITLE_HEADER:
-            raise RuntimeError("The recipe must have a title first")
-        if titles[1] != CuadroParser.AST_NODE_INGREDIENTS_HEADER:
-            raise RuntimeError("The recipe must have ingredients second")
-        if titles[2] != CuadroParser.AST_NODE_RECIPE_HEADER:
-            raise RuntimeError("The recipe must have the recipe third")
+        for kind, (expected, message) in zip(titles, self._TITLES):
+            if kind != expected:
+                raise RuntimeError(message)
 
     def validate_cooking_steps(self):
         """Validates the existence of function calls in the program."""
         for ast in self.asts:
-            if ast[0] == CuadroParser.AST_NODE_FUNCTION_BASED_DECLARATION:
-                funct_call = ast[2]
-                funct_call_name = funct_call[1]
+            if ast.kind == NodeKind.FUNCTION_BASED_DECLARATION:
+                funct_call_name = ast.call.name
                 if funct_call_name not in self._COOKING_STEPS:
                     raise RuntimeError(
                         f"Calling unknown Cooking Step: {funct_call_name}"
@@ -209,81 +280,169 @@ class SemanticAnalyzer:
 
     def validate_receip_structure(self):
         """A Cuadry recipe must have a title, ingredients and cooking steps, in that order"""
-        ast_iter = iter(self.asts)
-
-        # First title must be the title
-        ast = next(ast_iter)
-        if ast[0] != CuadroParser.AST_NODE_TITLE_HEADER:
-            raise RuntimeError("The recipe must start with a title first")
-
-        ast = next(ast_iter)
-        if ast[0] != CuadroParser.AST_NODE_INGREDIENTS_HEADER:
-            raise RuntimeError("The recipe must have ingredients second")
-
-        ingredients_acc = 0
-        while ast:
-            ast = next(ast_iter, None)
-
-            if ast is None:
-                raise RuntimeError("The recipe must have a recipe section")
-            if ast[0] == CuadroParser.AST_NODE_RECIPE_HEADER:
+        structure = RecipeStructure()
+        for ast in self.asts:
+            structure.visit(ast.kind)
+            if structure.error:
                 break
+        structure.end()
+        if structure.error:
+            raise RuntimeError(structure.error)
+
+    def analyze(self) -> List[CookingStep]:
+        """Runs the whole semantic analysis in a single pass over the program.
+
+        It builds the ingredients table, validates the program, follows the
+        ingredients dataflow and processes every cooking step, like
+        `process_ingredients`, `validate_ast`, `analyze_dataflow` and
+        `process_cooking_step` do on their own passes. The error raised is
+        the one they would raise first: a duplicated identifier, then the
+        titles, unknown cooking steps, the structure and at last any error
+        found processing the cooking steps.
+        """
+        self._INGREDIENTS = {}
+        declared = set()
+        titles = []
+        unknown_step = None
+        structure = RecipeStructure()
+        flow = IngredientFlow()
+        cooking_steps = []
+        step_error = None
 
-            if ast[0] != CuadroParser.AST_NODE_INGREDIENT_DECLARATION:
-                raise RuntimeError(
-                    "The recipe ingredients list should be a list of ingredients"
-                )
-            ingredients_acc += 1
-
-        if ingredients_acc == 0:
-            raise RuntimeError("The recipe must have at least one ingredient")
+        for ast in self.asts:
+            kind = ast.kind
+            if kind == NodeKind.INGREDIENT_DECLARATION:
+                if ast.name in declared:
+                    raise RuntimeError(
+                        f"The identifier {ast.name} "
+                        f"must be declared only once."
+                    )
+                declared.add(ast.name)
+                q = self._get_quantity(ast.quantity.value, ast.quantity.unit)
+                self._INGREDIENTS[ast.name] = Ingredient(ast.name, q)
+            elif kind <= NodeKind.RECIPE_HEADER:
+                titles.append(kind)
+            elif kind == NodeKind.FUNCTION_BASED_DECLARATION:
+                if unknown_step is None and ast.call.name not in self._COOKING_STEPS:
+                    unknown_step = ast.call.name
+
+            if not structure.error:
+                structure.visit(kind)
+            flow.add(ast)
+
+            # Steps are processed while no other error is known. The ones
+            # found later take precedence, so a step error is kept until
+            # the end of the program.
+            if (
+                kind == NodeKind.FUNCTION_BASED_DECLARATION
+                and step_error is None
+                and unknown_step is None
+                and not structure.error
+            ):
+                try:
+                    cooking_steps.append(self.process_cooking_step(ast))
+                except (RuntimeError, KeyError, IndexError) as e:
+                    step_error = e
+
+        self._check_titles(titles)
+        if unknown_step is not None:
+            raise RuntimeError(f"Calling unknown Cooking Step: {unknown_step}")
+        structure.end()
+        if structure.error:
+            raise RuntimeError(structure.error)
+        if step_error is not None:
+            raise step_error
+
+        self.warnings = flow.warnings()
+        return cooking_steps
+
+    def stream(self, asts: Iterable) -> Iterator:
+        """Analyzes the program as its instructions arrive, one at a time.
+
+        Yields what has to be output, in order: the headers and ingredient
+        declarations as they are, and the CookingStep of every cooking step.
+        Nothing but the ingredients table is kept of the instructions
+        already yielded. Every error is raised as soon as its instruction
+        is reached, so the first error in the program wins, instead of the
+        precedence between kinds of errors followed by `analyze`.
+        """
+        self._INGREDIENTS = {}
+        declared = set()
+        titles = []
+        structure = RecipeStructure()
+        flow = IngredientFlow()
 
-        receipe_acc = 0
-        while ast:
-            ast = next(ast_iter, None)
-            if ast is None:
-                break
-            if ast[0] != CuadroParser.AST_NODE_FUNCTION_BASED_DECLARATION:
-                raise RuntimeError(
-                    "The recipe must have a list of only cooking steps after the recipe header"
-                )
-            receipe_acc += 1
+        for ast in asts:
+            kind = ast.kind
+            if kind == NodeKind.INGREDIENT_DECLARATION:
+                if ast.name in declared:
+                    raise RuntimeError(
+                        f"The identifier {ast.name} "
+                        f"must be declared only once."
+                    )
+                declared.add(ast.name)
+                q = self._get_quantity(ast.quantity.value, ast.quantity.unit)
+                self._INGREDIENTS[ast.name] = Ingredient(ast.name, q)
+            elif kind <= NodeKind.RECIPE_HEADER:
+                titles.append(kind)
+                self._check_titles(titles, complete=False)
+            elif kind == NodeKind.FUNCTION_BASED_DECLARATION:
+                if ast.call.name not in self._COOKING_STEPS:
+                    raise RuntimeError(f"Calling unknown Cooking Step: {ast.call.name}")
+
+            structure.visit(kind)
+            if structure.error:
+                raise RuntimeError(structure.error)
+            flow.add(ast)
+
+            if kind == NodeKind.FUNCTION_BASED_DECLARATION:
+                yield self.process_cooking_step(ast)
+            else:
+                yield ast
 
-        if receipe_acc == 0:
-            raise RuntimeError("The recipe must have at least one cooking step")
+        self._check_titles(titles)
+        structure.end()
+        if structure.error:
+            raise RuntimeError(structure.error)
+        self.warnings = flow.warnings()
 
     def _process_nested_cooking_step(self, ast):
-        if ast[0] != CuadroParser.AST_FUNCTION_CALL:
+        if ast.kind != NodeKind.FUNCTION_CALL:
             raise RuntimeError(
                 f"A nested cooking step must be of AST type {CuadroParser.AST_FUNCTION_CALL}"
             )
 
-        ingredients = []
-        for tpl in ast[2:][0]:
-            if tpl[0] == CuadroParser.AST_IDENTIFIER:  # The param is an ingredient
-                if tpl[1] not in self._INGREDIENTS:
-                    raise RuntimeError(
-                        f"Unknown identifier '{tpl[1]}' used as parameter in {ast[2][1]} call"
-                    )
-
-                if not self._INGREDIENTS[tpl[1]].is_usable():
-                    raise RuntimeError(
-                        f"Ingredient {tpl[1]} was already used. It can be used again in {ast[1]} call"
-                    )
-
-                ingredients.append(self._INGREDIENTS[tpl[1]])
-
-            elif (
-                tpl[0] == CuadroParser.AST_FUNCTION_CALL
-            ):  # The param is a nested function call
-                nested_step = self._process_nested_cooking_step(tpl)
-                ingredients.append(nested_step)
+        # A frame per call still being processed: the call, its remaining
+        # args and the ingredients of the args already processed
+        stack = [(ast, iter(ast.args), [])]
+        while True:
+            call, args, ingredients = stack[-1]
+            for arg in args:
+                if arg.kind == NodeKind.IDENTIFIER:  # The param is an ingredient
+                    if arg.name not in self._INGREDIENTS:
+                        raise RuntimeError(
+                            f"Unknown identifier '{arg.name}' used as parameter in {call.args[1]} call"
+                        )
+
+                    if not self._INGREDIENTS[arg.name].is_usable():
+                        raise RuntimeError(
+                            f"Ingredient {arg.name} was already used. It can be used again in {call.name} call"
+                        )
+
+                    ingredients.append(self._INGREDIENTS[arg.name])
+
+                elif arg.kind == NodeKind.FUNCTION_CALL:  # The param is a nested function call
+                    stack.append((arg, iter(arg.args), []))
+                    break
+                else:
+                    raise RuntimeError(f"Unknown AST type at runtime: {KIND_NAMES[arg.kind]}")
             else:
-                raise RuntimeError(f"Unknown AST type at runtime: {tpl[0]}")
-
-        step_class = self._COOKING_STEPS[ast[1]]
-        step: CookingStep = step_class(self._INGREDIENTS, ingredients)
-        return step
+                stack.pop()
+                step_class = self._COOKING_STEPS[call.name]
+                step: CookingStep = step_class(self._INGREDIENTS, ingredients)
+                if not stack:
+                    return step
+                stack[-1][2].append(step)
 
     def process_cooking_step(self, ast) -> CookingStep:
         """Parses an AST for a Cooking step.
@@ -292,40 +451,18 @@ class SemanticAnalyzer:
             - Inserts the new variable from the AST into the Ingredients table.
             - It returns the CookingStep instance given the AST.
         """
-        if ast[0] != CuadroParser.AST_NODE_FUNCTION_BASED_DECLARATION:
+        if ast.kind != NodeKind.FUNCTION_BASED_DECLARATION:
             raise RuntimeError(
                 f"A cooking step must be of AST type {CuadroParser.AST_NODE_FUNCTION_BASED_DECLARATION}"
             )
 
-        ingredients = []
-        for tpl in ast[2:]:
-            if tpl[0] == CuadroParser.AST_IDENTIFIER:  # The param is an ingredient
-                if tpl[1] not in self._INGREDIENTS:
-                    raise RuntimeError(
-                        f"Unknown identifier {tpl[1]} used as parameter in {ast[2][1]} call"
-                    )
-
-                if not self._INGREDIENTS[tpl[1]].is_usable():
-                    raise RuntimeError(
-                        f"Ingredient {tpl[1]} was already used. It can be used again in {ast[1]} call"
-                    )
-
-                ingredients.append(self._INGREDIENTS[tpl[1]])
-
-            elif (
-                tpl[0] == CuadroParser.AST_FUNCTION_CALL
-            ):  # The param is a nested function call
-                nested_step = self._process_nested_cooking_step(tpl)
-                ingredients = ingredients + nested_step.ingredients
-            else:
-                raise RuntimeError(f"Unknown AST type at runtime: {tpl[0]}")
-
-        step_class = self._COOKING_STEPS[ast[2][1]]
-        step: CookingStep = step_class(self._INGREDIENTS, ingredients)
+        # The declared call is processed like a nested one, whose step
+        # is already the one of the declaration
+        step: CookingStep = self._process_nested_cooking_step(ast.call)
         step.do()
 
         # Add new variable to INGREDIENTS
-        self._INGREDIENTS[ast[1]] = Ingredient(
-            ast[1], Grams(1)
+        self._INGREDIENTS[ast.name] = Ingredient(
+            ast.name, Grams(1)
         )  # TODO: By default value 1. Pay attention
         return step
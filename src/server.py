@@ -0,0 +1,112 @@
+"""
+    Local compile server.
+
+    Keeps warm compilers in a bounded pool of worker processes and
+    serves them over HTTP, on localhost or on a Unix socket:
+
+        POST /compile   body: program source (utf-8)
+                        200 application/pdf with the compiled recipe
+                        422 text/plain with the diagnostics
+        GET  /health    200 "ok"
+"""
+import asyncio
+import contextlib
+import http.client
+import io
+import os
+from typing import Tuple
+
+from src.client import DEFAULT_HOST, DEFAULT_PORT
+from src.compiler import warm_pool, worker_compiler
+
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+def _compile_source(source: str) -> Tuple[bool, bytes]:
+    # The lexer and parser report some errors by printing them
+    diagnostics = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(diagnostics), contextlib.redirect_stderr(diagnostics):
+            result = worker_compiler().build("<request>", source)
+    except Exception as e:
+        diagnostics.write(f"{type(e).__name__}: {e}\n")
+        return False, diagnostics.getvalue().encode("utf-8")
+    return True, result.pdf
+
+
+class CompileServer:
+    def __init__(self, workers: int = None, cache_dir: str = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = warm_pool(self.workers, cache_dir)
+        # Bounds the requests being read or waiting on the pool, so a
+        # burst of clients doesn't pile up their sources in memory
+        self._slots = asyncio.Semaphore(self.workers * 4)
+
+    async def _respond(self, writer, status: int, content_type: str, body: bytes):
+        reason = http.client.responses.get(status, "")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin1")
+        )
+        writer.write(body)
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if len(request_line) < 2:
+                await self._respond(writer, 400, "text/plain", b"Malformed request\n")
+            elif request_line[:2] == ["GET", "/health"]:
+                await self._respond(writer, 200, "text/plain", b"ok\n")
+            elif request_line[:2] == ["POST", "/compile"]:
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, "text/plain", b"Program too large\n")
+                    return
+                # The body is only read once there's a slot for it
+                async with self._slots:
+                    source = (await reader.readexactly(length)).decode("utf-8")
+                    ok, payload = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, _compile_source, source
+                    )
+                if ok:
+                    await self._respond(writer, 200, "application/pdf", payload)
+                else:
+                    await self._respond(writer, 422, "text/plain; charset=utf-8", payload)
+            else:
+                await self._respond(writer, 404, "text/plain", b"Not found\n")
+        except (ValueError, UnicodeDecodeError, asyncio.IncompleteReadError):
+            await self._respond(writer, 400, "text/plain", b"Malformed request\n")
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None):
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle, unix_socket)
+            print(f"Compile server listening on {unix_socket} with {self.workers} workers")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Compile server listening on http://{host}:{port} with {self.workers} workers")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, workers=None, cache_dir=None):
+    async def main():
+        await CompileServer(workers, cache_dir).serve(host, port, unix_socket)
+
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+    Registry of the cooking steps a recipe can use.
+
+    Besides the built-in steps, step classes can be listed in the
+    CUADROPY_STEPS environment variable as comma separated `name=module:Class`
+    entries, which take precedence, or registered by installed packages under
+    the `cuadropy.steps` entry point group, for names not taken by the
+    former. Only the names are read when the registry is built, once per
+    process, and the module of a step is imported the first time a recipe
+    uses it. Entry points are slow to find, so they are only looked for when
+    a recipe uses a step that isn't built-in or listed, or when every step
+    is needed.
+"""
+import importlib
+import os
+from typing import Callable, Dict, Iterator, Mapping, Optional
+
+ENTRY_POINT_GROUP = "cuadropy.steps"
+ENV_VAR = "CUADROPY_STEPS"
+
+BUILTIN_STEPS = {
+    "filetear": "src.semantic_analyzer:Fillet",
+    "sazonar": "src.semantic_analyzer:Season",
+    "sarten": "src.semantic_analyzer:Fry",
+    "mezclar": "src.semantic_analyzer:Mix",
+}
+
+
+def parse_steps(value: str) -> Dict[str, str]:
+    """The steps listed in the format of CUADROPY_STEPS, as name: "module:Class"."""
+    steps = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, spec = entry.partition("=")
+        if not sep or ":" not in spec:
+            raise RuntimeError(f"Invalid cooking step '{entry}' in {ENV_VAR}, expected name=module:Class")
+        steps[name.strip()] = spec.strip()
+    return steps
+
+
+class StepRegistry(Mapping):
+    """Maps the name of every cooking step to its CookingStep class.
+
+    `specs` are "module:Class" references, the class is imported when its
+    name is first looked up. Checking whether a step exists never imports it.
+    `more_specs` gives the specs of the steps not in `specs`, and is only
+    called the first time a name isn't found or every step is listed.
+    """
+
+    def __init__(self, specs: Mapping[str, str], more_specs: Callable[[], Mapping[str, str]] = None):
+        self._specs = dict(specs)
+        self._more_specs = more_specs
+        self._classes: Dict[str, type] = {}
+        self._digest: Optional[str] = None
+
+    def _find_more(self):
+        if self._more_specs is not None:
+            more_specs, self._more_specs = self._more_specs, None
+            for name, spec in more_specs().items():
+                self._specs.setdefault(name, spec)
+
+    def __contains__(self, name):
+        if name not in self._specs:
+            self._find_more()
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        self._find_more()
+        return iter(self._specs)
+
+    def __len__(self):
+        self._find_more()
+        return len(self._specs)
+
+    def __getitem__(self, name: str) -> type:
+        try:
+            return self._classes[name]
+        except KeyError:
+            return self._load(name)
+
+    def __reduce__(self):
+        # Analyzers are cached and sent between processes, which have their own registry
+        return cooking_steps, ()
+
+    def digest(self) -> str:
+        """A hash of the class every name maps to, which changes when the
+        registered steps do."""
+        if self._digest is None:
+            import hashlib
+
+            self._find_more()
+            specs = "\0".join(f"{name}={spec}" for name, spec in sorted(self._specs.items()))
+            self._digest = hashlib.sha256(specs.encode("utf-8")).hexdigest()
+        return self._digest
+
+    def loaded(self) -> Iterator[str]:
+        """The names of the steps already imported."""
+        return iter(self._classes)
+
+    def _load(self, name: str) -> type:
+        if name not in self:
+            raise KeyError(name)
+        spec = self._specs[name]
+        module_name, _, attribute = spec.partition(":")
+        try:
+            step_class = importlib.import_module(module_name)
+            for part in attribute.split("."):
+                step_class = getattr(step_class, part)
+        except (ImportError, AttributeError) as e:
+            raise RuntimeError(f"Unable to load cooking step {name} from {spec}: {e}")
+
+        from src.semantic_analyzer import CookingStep
+
+        if not (isinstance(step_class, type) and issubclass(step_class, CookingStep)):
+            raise RuntimeError(f"Cooking step {name} from {spec} is not a CookingStep")
+        if step_class.lexical_name() != name:
+            raise RuntimeError(
+                f"Cooking step {name} from {spec} is named {step_class.lexical_name()} in recipes"
+            )
+        self._classes[name] = step_class
+        return step_class
+
+
+def discover_steps(environ: Mapping[str, str] = os.environ) -> Dict[str, str]:
+    """The spec of the built-in steps and of the ones in CUADROPY_STEPS,
+    which replace the built-in ones."""
+    specs = dict(BUILTIN_STEPS)
+    specs.update(parse_steps(environ.get(ENV_VAR, "")))
+    return specs
+
+
+def entry_point_steps() -> Dict[str, str]:
+    """The spec of the steps registered by installed packages."""
+    # Slow to import, and scanning the installed packages is slower
+    from importlib.metadata import entry_points
+
+    return {entry_point.name: entry_point.value for entry_point in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+_registry: Optional[StepRegistry] = None
+
+
+def cooking_steps() -> StepRegistry:
+    """The registry of this process, built the first time it's needed."""
+    global _registry
+    if _registry is None:
+        _registry = StepRegistry(discover_steps(), entry_point_steps)
+    return _registry
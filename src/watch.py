@@ -0,0 +1,62 @@
+"""
+    Watch mode: recompiles the CUADRO programs of a directory
+    every time one of them is saved.
+"""
+import os
+import time
+from typing import Dict
+
+from src.batch import collect_sources
+from src.compiler import CuadroCompiler
+from src.incremental import IncrementalProgram
+
+
+def _recompile(compiler: CuadroCompiler, program: IncrementalProgram, output: str, mtime: float):
+    start = time.perf_counter()
+    with open(program.filename, "r") as f:
+        stats = program.update(f.read())
+
+    if stats.first_affected is None:
+        print(f"{program.filename}: no instruction changed")
+        return
+
+    pdf = compiler.render(program.sem_analyzer, program.asts, program.cooking_steps)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(pdf)
+
+    compile_ms = (time.perf_counter() - start) * 1000
+    latency_ms = (time.time() - mtime) * 1000
+    analysis = "full analysis" if stats.full_analysis else f"analysis from instruction {stats.first_affected}"
+    print(
+        f"{program.filename}: reparsed {stats.reparsed_lines} line(s), {analysis}, "
+        f"compiled in {compile_ms:.1f} ms, edit-to-PDF {latency_ms:.1f} ms -> {output}"
+    )
+
+
+def watch(directory: str, output_dir: str, interval: float = 0.2):
+    compiler = CuadroCompiler()
+    programs: Dict[str, IncrementalProgram] = {}
+    mtimes: Dict[str, float] = {}
+
+    print(f"Watching {directory} for changes. Press Ctrl+C to stop.")
+    while True:
+        for source, name in collect_sources([directory]):
+            try:
+                mtime = os.stat(source).st_mtime
+            except OSError:
+                continue
+            if mtimes.get(source) == mtime:
+                continue
+            mtimes[source] = mtime
+
+            program = programs.get(source)
+            if program is None:
+                program = programs[source] = IncrementalProgram(source, compiler.lxr, compiler.parser)
+            output = os.path.join(output_dir, os.path.splitext(name)[0] + ".pdf")
+            try:
+                _recompile(compiler, program, output, mtime)
+            except Exception as e:
+                print(f"{source}: {type(e).__name__}: {e}")
+
+        time.sleep(interval)